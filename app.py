@@ -1,11 +1,36 @@
 import sys
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import pandas as pd
+from flask import Flask, Response, g, make_response, render_template, request, jsonify, redirect, url_for
 import numpy as np
 import joblib
 import os
 import json
-import shap
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+
+from contributions import ContributionIndex
+from explanation_jobs import ExplanationJobs
+from feature_encoder import FeatureEncoder
+from forest_engine import PackedForest
+from inference_pool import InferenceBusy, InferencePool, default_max_workers
+from model_bundle import DEFAULT_RISK_CATEGORY_CUTOFFS, bundle_path, load_bundle
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics, SamplingProfiler
+from model_registry import ModelRegistry, file_signature
+from percentiles import PERCENTILES_FILENAME, load_percentiles
+from prediction_cache import PredictionCache
+from resource_store import ResourceStore
+from result_store import make_result_store
+from tree_shap import ForestExplainer
+from vocabulary import VOCABULARY_FILENAME, check_one_hot_index, load_vocabulary
+from what_if import WhatIfSweep
+
+# The models were fitted on DataFrames but are scored on the encoders' NumPy arrays,
+# whose columns are already in the training order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
 
 # Add the directory containing the models to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'models')))
@@ -14,74 +39,51 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'models'
 # These are typically non-actionable demographic features.
 excluded_features_from_breakdown = ['Age', 'Gender']
 
+# Answers the what-if sweep varies: the ones a person can act on. Features excluded
+# from the breakdown above are never varied.
+what_if_features = {
+    'student': ['Sleep Duration', 'Dietary Habits', 'Work/Study Hours', 'Financial Stress', 'Academic Pressure',
+                'Study Satisfaction', 'CGPA'],
+    'professional': ['Sleep Duration', 'Dietary Habits', 'Work/Study Hours', 'Financial Stress', 'Work Pressure',
+                     'Job Satisfaction'],
+}
+
+# Pairs of answers the sweep changes together unless the request names its own
+default_what_if_pairs = {
+    'student': [('Sleep Duration', 'Dietary Habits'), ('Academic Pressure', 'Work/Study Hours')],
+    'professional': [('Sleep Duration', 'Dietary Habits'), ('Work Pressure', 'Work/Study Hours')],
+}
+
 # Construct absolute paths to the model files and load them globally
 base_dir = os.path.dirname(os.path.abspath(__file__))
 models_dir = os.path.join(base_dir, 'models')
 data_dir = os.path.join(base_dir, 'data')
 
-# --- GLOBAL MODEL AND DATA LOADING WITH ERROR HANDLING ---
-try:
-    print("Attempting to load models, scalers, and column files...")
-    student_model_path = os.path.join(models_dir, 'best_model_students.pkl')
-    professional_model_path = os.path.join(models_dir, 'best_model_professionals.pkl')
-    student_cols_path = os.path.join(models_dir, 'student_columns.json')
-    professional_cols_path = os.path.join(models_dir, 'professional_columns.json')
-    student_scaler_path = os.path.join(models_dir, 'student_scaler.pkl')
-    professional_scaler_path = os.path.join(models_dir, 'professional_scaler.pkl')
-
-    best_model_students = joblib.load(student_model_path)
-    best_model_professionals = joblib.load(professional_model_path)
-    student_scaler = joblib.load(student_scaler_path)
-    professional_scaler = joblib.load(professional_scaler_path)
-    with open(student_cols_path, 'r') as f:
-        students_cols = json.load(f)
-    with open(professional_cols_path, 'r') as f:
-        professionals_cols = json.load(f)
+def compute_model_version(paths):
+    """Returns a short content hash identifying a set of model artifacts."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
 
-    # Create SHAP Explainers
-    student_explainer = shap.TreeExplainer(best_model_students)
-    professional_explainer = shap.TreeExplainer(best_model_professionals)
-    print("Models, scalers, and column files loaded successfully.")
+# Categorical inputs that are one-hot encoded for each model
+student_categorical_cols = ["City", "Dietary Habits", "Sleep Duration", "Degree", "Academic Pressure", "Study Satisfaction", "Financial Stress"]
+professional_categorical_cols = ["City", "Dietary Habits", "Sleep Duration", "Degree", "Profession", "Work Pressure", "Job Satisfaction", "Financial Stress"]
 
-except FileNotFoundError as e:
-    print(f"CRITICAL ERROR: Model or columns file not found at startup: {e}")
-    print("Please ensure 'train_models.py' has been run and all model/scaler/json files are in the 'models/' directory and correctly committed to Git.")
-    sys.exit(1) # Exit application if critical files are missing
-except Exception as e:
-    print(f"CRITICAL ERROR: An unexpected error occurred during model loading: {e}")
-    sys.exit(1)
-
-# --- Load unique categorical values from the dataset ---
-try:
-    print("Attempting to load main dataset (final_depression_dataset_1.csv)...")
-    df_full_path = os.path.join(base_dir, "final_depression_dataset_1.csv")
-    df_full = pd.read_csv(df_full_path)
-    print("Main dataset loaded successfully.")
-
-    unique_cities = sorted(df_full['City'].dropna().unique().tolist())
-    unique_student_degrees = sorted(df_full[df_full['Working Professional or Student'] == 'Student']['Degree'].dropna().unique().tolist())
-    unique_professions = sorted(df_full[df_full['Working Professional or Student'] == 'Working Professional']['Profession'].dropna().unique().tolist())
-    all_unique_degrees_from_dataset = sorted(df_full['Degree'].dropna().unique().tolist())
-    print("Unique categorical values extracted.")
-
-except FileNotFoundError as e:
-    print(f"CRITICAL ERROR: final_depression_dataset_1.csv not found at startup: {e}")
-    print("Please ensure 'final_depression_dataset_1.csv' is in the project root and correctly committed to Git.")
-    sys.exit(1) # Exit application if critical dataset is missing
-except pd.errors.EmptyDataError as e:
-    print(f"CRITICAL ERROR: final_depression_dataset_1.csv is empty or malformed: {e}")
-    sys.exit(1)
-except Exception as e:
-    print(f"CRITICAL ERROR: An unexpected error occurred during dataset loading or unique value extraction: {e}")
-    sys.exit(1)
+# Numerical inputs that are standardised with the fitted scalers
+student_numerical_cols = ['Age', 'CGPA', 'Work/Study Hours']
+professional_numerical_cols = ['Age', 'Work/Study Hours']
 
 # Define preprocessing functions
 def preprocess_student_data(df, required_columns, scaler):
+    import pandas as pd
+
     df = df.copy()
     if "Name" in df.columns:
         df = df.drop(columns=["Name"])
 
-    numerical_cols = ['Age', 'CGPA', 'Work/Study Hours']
+    numerical_cols = student_numerical_cols
 
     # Correctly handle binary features to align with training script
     for col in ["Have you ever had suicidal thoughts ?", "Family History of Mental Illness"]:
@@ -91,7 +93,7 @@ def preprocess_student_data(df, required_columns, scaler):
         df["Gender"] = df["Gender"].map({"Male": 1, "Female": 0})
 
     # Convert all other relevant categorical columns to one-hot encoding
-    categorical_to_encode = [col for col in ["City", "Dietary Habits", "Sleep Duration", "Degree", "Academic Pressure", "Study Satisfaction", "Financial Stress"] if col in df.columns]
+    categorical_to_encode = [col for col in student_categorical_cols if col in df.columns]
     df_encoded = pd.get_dummies(df, columns=categorical_to_encode, drop_first=False)
 
     # Align columns before scaling
@@ -109,11 +111,13 @@ def preprocess_student_data(df, required_columns, scaler):
     return df_aligned.astype(float)
 
 def preprocess_professional_data(df, required_columns, scaler):
+    import pandas as pd
+
     df = df.copy()
     if "Name" in df.columns:
         df = df.drop(columns=["Name"])
 
-    numerical_cols = ['Age', 'Work/Study Hours']
+    numerical_cols = professional_numerical_cols
 
     # Correctly handle binary features
     for col in ["Have you ever had suicidal thoughts ?", "Family History of Mental Illness"]:
@@ -123,7 +127,7 @@ def preprocess_professional_data(df, required_columns, scaler):
         df["Gender"] = df["Gender"].map({"Male": 1, "Female": 0})
 
     # Convert all other relevant categorical columns to one-hot encoding
-    categorical_to_encode = [col for col in ["City", "Dietary Habits", "Sleep Duration", "Degree", "Profession", "Work Pressure", "Job Satisfaction", "Financial Stress"] if col in df.columns]
+    categorical_to_encode = [col for col in professional_categorical_cols if col in df.columns]
     df_encoded = pd.get_dummies(df, columns=categorical_to_encode, drop_first=False)
 
     # Align columns before scaling
@@ -140,6 +144,257 @@ def preprocess_professional_data(df, required_columns, scaler):
 
     return df_aligned.astype(float)
 
+# --- GLOBAL MODEL AND DATA LOADING WITH ERROR HANDLING ---
+# By default everything is loaded at import time, so `gunicorn --preload` (see
+# gunicorn.conf.py) loads it once in the master and the forked workers share those
+# pages copy-on-write. With MINDCARE_LAZY_LOAD=1 loading instead runs in a background
+# thread of each worker, started on import or on the first request after a fork, and
+# requests that need the models wait for it. /ready reports when warmup has finished.
+LAZY_LOAD = os.environ.get('MINDCARE_LAZY_LOAD', '0') == '1'
+
+# How the forests are evaluated: 'packed' (forest_engine.PackedForest, same probabilities
+# as predict_proba without sklearn's per-call overhead) or 'sklearn' (model.predict_proba)
+INFERENCE_ENGINE = os.environ.get('MINDCARE_INFERENCE_ENGINE', 'packed')
+
+# Seconds a request waits for a lazy warmup before getting a 503
+WARMUP_WAIT = float(os.environ.get('MINDCARE_WARMUP_WAIT', 60))
+
+warmup_state = {'ready': False, 'error': None, 'pid': None, 'model_load_seconds': None, 'warmup_seconds': None}
+warmup_done = threading.Event()
+warmup_lock = threading.Lock()
+
+# Artifact files of each on-disk format, per population
+LEGACY_MODEL_FILES = {
+    'student': ('best_model_students.pkl', 'student_scaler.pkl', 'student_columns.json'),
+    'professional': ('best_model_professionals.pkl', 'professional_scaler.pkl', 'professional_columns.json'),
+}
+
+def make_population(user_type, version, model, predictor, explainer, scaler, columns, encoder,
+                    risk_category_cutoffs=DEFAULT_RISK_CATEGORY_CUTOFFS):
+    return {
+        'user_type': user_type,
+        'model_version': version,
+        'model': model,
+        'predictor': predictor,
+        'explainer': explainer,
+        'scaler': scaler,
+        'columns': columns,
+        'encoder': encoder,
+        # (feature, value) -> SHAP column lookup for the risk factor breakdown
+        'contribution_index': ContributionIndex(columns, excluded_features_from_breakdown),
+        # One-answer (and answer pair) variants scored by /predict/<user_type>/what-if
+        'what_if': WhatIfSweep(encoder, [f for f in what_if_features[user_type] if f not in excluded_features_from_breakdown]),
+        'risk_category_cutoffs': risk_category_cutoffs,
+    }
+
+def use_model_bundles():
+    """Whether models/*.bundle should be served (both exist and the packed engine is selected)."""
+    return INFERENCE_ENGINE == 'packed' and all(os.path.exists(bundle_path(models_dir, p)) for p in ('student', 'professional'))
+
+def model_files():
+    """The artifact files the active format is loaded from; the registry watches these."""
+    percentiles_path = os.path.join(models_dir, PERCENTILES_FILENAME)
+    if use_model_bundles():
+        return [bundle_path(models_dir, p) for p in ('student', 'professional')] + [percentiles_path]
+    paths = [os.path.join(models_dir, name) for files in LEGACY_MODEL_FILES.values() for name in files]
+    return paths + [os.path.join(models_dir, VOCABULARY_FILENAME), percentiles_path]
+
+def load_model_bundles():
+    """Loads models/student.bundle and models/professional.bundle (see model_bundle.py).
+
+    The forests, explainers, scalers, column lists, vocabulary and thresholds all come
+    from the two memory-mapped bundles; no pickle is opened.
+    """
+    print("Attempting to load model bundles...")
+    bundles = {population: load_bundle(bundle_path(models_dir, population), verify=True) for population in ('student', 'professional')}
+    version = hashlib.sha256((bundles['student'].content_hash + bundles['professional'].content_hash).encode('ascii')).hexdigest()[:12]
+    models = {'version': version, 'format': 'bundle', 'vocabulary': bundles['student'].vocabulary}
+    for population, bundle in bundles.items():
+        encoder = FeatureEncoder(bundle.columns, bundle.scaler, bundle.numerical_cols, bundle.categorical_cols)
+        models[population] = make_population(population, version, None, bundle.forest(), bundle.explainer(), bundle.scaler,
+                                             bundle.columns, encoder, bundle.risk_category_cutoffs)
+    print(f"Model bundles loaded successfully (model version {version}).")
+    return models
+
+def load_model_files():
+    """Loads the separate model, scaler and column files and builds the encoders and explainers."""
+    print("Attempting to load models, scalers, and column files...")
+    student_model_path = os.path.join(models_dir, 'best_model_students.pkl')
+    professional_model_path = os.path.join(models_dir, 'best_model_professionals.pkl')
+    student_cols_path = os.path.join(models_dir, 'student_columns.json')
+    professional_cols_path = os.path.join(models_dir, 'professional_columns.json')
+    student_scaler_path = os.path.join(models_dir, 'student_scaler.pkl')
+    professional_scaler_path = os.path.join(models_dir, 'professional_scaler.pkl')
+
+    best_model_students = joblib.load(student_model_path)
+    best_model_professionals = joblib.load(professional_model_path)
+    student_scaler = joblib.load(student_scaler_path)
+    professional_scaler = joblib.load(professional_scaler_path)
+    with open(student_cols_path, 'r') as f:
+        students_cols = json.load(f)
+    with open(professional_cols_path, 'r') as f:
+        professionals_cols = json.load(f)
+
+    version = compute_model_version([student_model_path, professional_model_path, student_scaler_path,
+                                     professional_scaler_path, student_cols_path, professional_cols_path])
+
+    # Create SHAP Explainers (exact TreeSHAP over the flattened forests; see tree_shap.py)
+    student_explainer = ForestExplainer(best_model_students)
+    professional_explainer = ForestExplainer(best_model_professionals)
+
+    # Pandas-free encoders used on the request path; their output is bit-identical to the
+    # preprocess_*_data functions above, which remain the reference implementation
+    student_encoder = FeatureEncoder(students_cols, student_scaler, student_numerical_cols, student_categorical_cols)
+    professional_encoder = FeatureEncoder(professionals_cols, professional_scaler, professional_numerical_cols, professional_categorical_cols)
+
+    # Whatever scores requests only needs predict_proba
+    if INFERENCE_ENGINE == 'packed':
+        student_predictor = PackedForest(best_model_students)
+        professional_predictor = PackedForest(best_model_professionals)
+    elif INFERENCE_ENGINE == 'sklearn':
+        student_predictor = best_model_students
+        professional_predictor = best_model_professionals
+    else:
+        raise ValueError(f"Unknown MINDCARE_INFERENCE_ENGINE {INFERENCE_ENGINE!r}; expected 'packed' or 'sklearn'")
+    print(f"Models, scalers, and column files loaded successfully (model version {version}).")
+    return {
+        'version': version,
+        'format': 'files',
+        'student': make_population('student', version, best_model_students, student_predictor, student_explainer,
+                                   student_scaler, students_cols, student_encoder),
+        'professional': make_population('professional', version, best_model_professionals, professional_predictor,
+                                        professional_explainer, professional_scaler, professionals_cols, professional_encoder),
+    }
+
+def load_models():
+    """Builds a complete model set: both populations plus the dropdown vocabulary.
+
+    Uses the model bundles when both exist and the packed engine is selected; the
+    separate pickles and JSON files otherwise. Nothing global is touched, so the
+    registry can build a new set while requests are served from the old one.
+    """
+    if use_model_bundles():
+        try:
+            models = load_model_bundles()
+        except (OSError, KeyError, ValueError) as e:
+            raise RuntimeError(f"Invalid model bundle: {e}. Please re-run 'train_models.py' (or 'python model_bundle.py').") from e
+    else:
+        try:
+            models = load_model_files()
+        except FileNotFoundError as e:
+            raise RuntimeError(f"Model or columns file not found at startup: {e}. Please ensure 'train_models.py' has been run and all model/scaler/json files are in the 'models/' directory and correctly committed to Git.") from e
+        except Exception as e:
+            raise RuntimeError(f"An unexpected error occurred during model loading: {e}") from e
+    models['vocabulary'] = load_dataset_vocabulary(models)
+    percentiles = load_risk_percentiles()
+    for population in ('student', 'professional'):
+        models[population]['percentiles'] = percentiles
+    return models
+
+def load_risk_percentiles():
+    """Returns the peer score distributions written by train_models.py, or None if there are none."""
+    try:
+        return load_percentiles(models_dir)
+    except FileNotFoundError:
+        print(f"{PERCENTILES_FILENAME} not found; predictions will not be ranked against peers. Run 'python percentiles.py' to build it.")
+        return None
+    except (OSError, KeyError, ValueError) as e:
+        raise RuntimeError(f"Invalid {PERCENTILES_FILENAME}: {e}") from e
+
+def load_dataset_vocabulary(models):
+    """Returns the city, degree and profession dropdown values written by train_models.py.
+
+    Falls back to deriving them from final_depression_dataset_1.csv for models trained
+    before the vocabulary artifact existed.
+    """
+    try:
+        if 'vocabulary' in models:
+            vocabulary = models['vocabulary']
+        else:
+            print(f"Attempting to load categorical vocabulary ({VOCABULARY_FILENAME})...")
+            vocabulary = load_vocabulary(models_dir)
+        check_one_hot_index(vocabulary['one_hot_index']['student'], models['student']['columns'])
+        check_one_hot_index(vocabulary['one_hot_index']['professional'], models['professional']['columns'])
+        print("Categorical vocabulary loaded successfully.")
+        return {key: vocabulary[key] for key in ('unique_cities', 'unique_student_degrees', 'unique_professions', 'all_unique_degrees')}
+    except FileNotFoundError:
+        print(f"{VOCABULARY_FILENAME} not found; falling back to the dataset.")
+    except (KeyError, ValueError) as e:
+        raise RuntimeError(f"Invalid {VOCABULARY_FILENAME}: {e}") from e
+
+    import pandas as pd
+
+    try:
+        print("Attempting to load main dataset (final_depression_dataset_1.csv)...")
+        df_full_path = os.path.join(base_dir, "final_depression_dataset_1.csv")
+        df_full = pd.read_csv(df_full_path)
+        print("Main dataset loaded successfully.")
+
+        vocabulary = {
+            'unique_cities': sorted(df_full['City'].dropna().unique().tolist()),
+            'unique_student_degrees': sorted(df_full[df_full['Working Professional or Student'] == 'Student']['Degree'].dropna().unique().tolist()),
+            'unique_professions': sorted(df_full[df_full['Working Professional or Student'] == 'Working Professional']['Profession'].dropna().unique().tolist()),
+            'all_unique_degrees': sorted(df_full['Degree'].dropna().unique().tolist()),
+        }
+        print("Unique categorical values extracted.")
+        return vocabulary
+
+    except FileNotFoundError as e:
+        raise RuntimeError(f"Neither {VOCABULARY_FILENAME} nor final_depression_dataset_1.csv was found at startup: {e}. Please run 'train_models.py' (or 'python vocabulary.py') and commit the file in the 'models/' directory.") from e
+    except pd.errors.EmptyDataError as e:
+        raise RuntimeError(f"final_depression_dataset_1.csv is empty or malformed: {e}") from e
+    except Exception as e:
+        raise RuntimeError(f"An unexpected error occurred during dataset loading or unique value extraction: {e}") from e
+
+def on_models_swapped(previous, models):
+    if previous is None:
+        return
+    # Cached scores are keyed on the old version and can never be hit again
+    prediction_cache.clear()
+    print(f"Model version {previous['version']} replaced by {models['version']}.")
+
+# The active model set. With MINDCARE_MODEL_WATCH_INTERVAL > 0 every worker polls the
+# artifact files and hot-swaps a retrained set in once the files stop changing; an
+# authorised POST /admin/reload-models does the same on demand (for one worker).
+# Replace artifacts by renaming new files into place (as train_models.py does): a
+# bundle is memory-mapped, so overwriting it in place would corrupt the live models.
+model_registry = ModelRegistry(
+    loader=load_models,
+    signature=lambda: file_signature(model_files()),
+    on_swap=on_models_swapped,
+    watch_interval=float(os.environ.get('MINDCARE_MODEL_WATCH_INTERVAL', 0)),
+    settle=float(os.environ.get('MINDCARE_MODEL_SETTLE', 2)),
+)
+
+def warmup():
+    """Loads everything the routes need and records the outcome for /ready. Returns True on success."""
+    started = time.perf_counter()
+    try:
+        model_registry.load()
+        warmup_state['model_load_seconds'] = model_registry.load_seconds
+    except RuntimeError as e:
+        print(f"CRITICAL ERROR: {e}")
+        warmup_state['error'] = str(e)
+        return False
+    finally:
+        warmup_done.set()
+    warmup_state['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    warmup_state['ready'] = True
+    return True
+
+def ensure_warmup_started():
+    """Starts the lazy warmup thread in this process unless it is already running or done."""
+    with warmup_lock:
+        # A thread started before a fork does not exist in the child, so key on the pid
+        if warmup_state['ready'] or warmup_state['pid'] == os.getpid():
+            return
+        warmup_state['pid'] = os.getpid()
+        threading.Thread(target=warmup, name='warmup', daemon=True).start()
+
+if LAZY_LOAD:
+    ensure_warmup_started()
+elif not warmup():
+    sys.exit(1) # Exit application if critical files are missing
 
 app = Flask(__name__)
 
@@ -182,13 +437,114 @@ degree_map = {
 # --- End of Corrected Map ---
 
 # --- Resource Loading Functions ---
+# Resource files are parsed once and re-read only when research_scraper.py (or a
+# deploy) replaces them; see resource_store.py
+resource_store = ResourceStore(data_dir)
+
+# Number of suggestions returned by /get_suggestions/<user_type>
+SUGGESTION_COUNT = 10
+
 def load_resources(resource_type):
-    file_path = os.path.join(data_dir, f'{resource_type}_resources.json')
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"Support & Awareness Platforms": [], "Research & Studies": [], "Suggestions": []}
+    return resource_store.get(resource_type).resources
+
+def render_resources_page(user_type):
+    """Serves a resources page rendered once per version of its data file, with an ETag."""
+    entry = resource_store.get(user_type)
+    if entry.page is None:
+        html = render_template(f'{user_type}_resources.html', resources=entry.resources)
+        entry.page = (html, hashlib.sha256(html.encode('utf-8')).hexdigest()[:16])
+    html, etag = entry.page
+    response = make_response(html)
+    response.set_etag(etag)
+    # Let browsers keep the page but revalidate it, so a scraper update shows up at once
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# --- Instrumentation ---
+# Per-process request counters and latency histograms, exposed on /metrics
+metrics = Metrics()
+metrics.counter('mindcare_requests_total', 'HTTP requests by endpoint, method, status and user type.')
+metrics.histogram('mindcare_request_duration_seconds', 'Wall-clock time per HTTP request, by endpoint.')
+metrics.histogram('mindcare_stage_duration_seconds', 'Time spent in each stage of scoring a request, by user type.')
+metrics.counter('mindcare_scored_rows_total', 'Rows scored by the models (cache misses), by user type.')
+
+# With MINDCARE_PROFILING=1 a request carrying `X-Profile: 1` is run under a sampling
+# profiler; the response's X-Profile-Id header names the profile at /profiles/<id>
+PROFILING_ENABLED = os.environ.get('MINDCARE_PROFILING', '0') == '1'
+PROFILE_INTERVAL = float(os.environ.get('MINDCARE_PROFILE_INTERVAL', 0.001))
+MAX_STORED_PROFILES = 20
+stored_profiles = OrderedDict()
+stored_profiles_lock = threading.Lock()
+
+@app.before_request
+def start_request_instrumentation():
+    g.request_started = time.perf_counter()
+    model_registry.ensure_watcher_started()
+    if PROFILING_ENABLED and request.headers.get('X-Profile') == '1':
+        g.profiler = SamplingProfiler(interval=PROFILE_INTERVAL).start()
+
+@app.after_request
+def finish_request_instrumentation(response):
+    started = g.pop('request_started', None)
+    endpoint = request.endpoint or 'unmatched'
+    if started is not None:
+        metrics.observe('mindcare_request_duration_seconds', time.perf_counter() - started, {'endpoint': endpoint})
+    user_type = (request.view_args or {}).get('user_type') or g.get('user_type', '')
+    if user_type not in ('student', 'professional'):
+        # Keep label cardinality bounded for unmatched or malformed paths
+        user_type = ''
+    metrics.inc('mindcare_requests_total', {'endpoint': endpoint, 'method': request.method,
+                                            'status': str(response.status_code), 'user_type': user_type})
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profile_id = uuid.uuid4().hex[:12]
+        with stored_profiles_lock:
+            stored_profiles[profile_id] = profiler.stop()
+            while len(stored_profiles) > MAX_STORED_PROFILES:
+                stored_profiles.popitem(last=False)
+        response.headers['X-Profile-Id'] = profile_id
+    model_version = g.get('model_version')
+    if model_version is not None:
+        response.headers['X-Model-Version'] = model_version
+    return response
+
+@app.teardown_request
+def stop_unfinished_profiler(exc):
+    # after_request is skipped when a view raises; do not leave the sampler running
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+# Routes that can be served before the models and dataset vocabulary are loaded
+MODEL_FREE_ENDPOINTS = {'static', 'ready', 'index', 'student_dashboard', 'professional_dashboard',
+                        'student_resources_page', 'professional_resources_page', 'get_suggestions',
+                        'metrics_endpoint', 'get_profile'}
+
+@app.before_request
+def require_warmup():
+    if warmup_state['ready'] or request.endpoint in MODEL_FREE_ENDPOINTS:
+        return None
+    ensure_warmup_started()
+    warmup_done.wait(timeout=WARMUP_WAIT)
+    if not warmup_state['ready']:
+        return jsonify({'error': 'The service is still loading its models. Please try again shortly.'}), 503
+    return None
+
+@app.route('/ready')
+def ready():
+    ensure_warmup_started()
+    status = {
+        'ready': warmup_state['ready'],
+        'error': warmup_state['error'],
+        'model_load_seconds': warmup_state['model_load_seconds'],
+        'warmup_seconds': warmup_state['warmup_seconds'],
+    }
+    if warmup_state['ready']:
+        status['model_version'] = model_registry.active['version']
+        status['models'] = model_registry.stats()
+        return jsonify(status), 200
+    return jsonify(status), 503
 
 @app.route('/')
 def index():
@@ -204,22 +560,24 @@ def professional_dashboard():
 
 @app.route('/student_form')
 def student_form_page():
-    return render_template('student_form.html', unique_cities=unique_cities, unique_student_degrees=unique_student_degrees)
+    vocabulary = active_vocabulary()
+    return render_template('student_form.html', unique_cities=vocabulary['unique_cities'],
+                           unique_student_degrees=vocabulary['unique_student_degrees'])
 
 @app.route('/professional_form')
 def professional_form_page():
     # The 'unique_professions' list is the source of truth for the dropdown
-    return render_template('professional_form.html', unique_cities=unique_cities, unique_professions=unique_professions)
+    vocabulary = active_vocabulary()
+    return render_template('professional_form.html', unique_cities=vocabulary['unique_cities'],
+                           unique_professions=vocabulary['unique_professions'])
 
 @app.route('/student_resources')
 def student_resources_page():
-    resources = load_resources('student')
-    return render_template('student_resources.html', resources=resources)
+    return render_resources_page('student')
 
 @app.route('/professional_resources')
 def professional_resources_page():
-    resources = load_resources('professional')
-    return render_template('professional_resources.html', resources=resources)
+    return render_resources_page('professional')
 
 @app.route('/get_suggestions/<user_type>', methods=['GET'])
 def get_suggestions(user_type):
@@ -227,16 +585,9 @@ def get_suggestions(user_type):
     if user_type not in ['student', 'professional']:
         return jsonify({'error': 'Invalid user type'}), 400
     
-    resources = load_resources(user_type)
-    suggestions = resources.get("Suggestions", [])
-    
-    # Shuffle suggestions randomly
-    import random
-    random.shuffle(suggestions)
-    
-    # Limit to 10 suggestions
-    suggestions = suggestions[:10]
-    
+    # Random pick of 10 suggestions without shuffling the whole list
+    suggestions = resource_store.get(user_type).sample_suggestions(SUGGESTION_COUNT)
+
     return jsonify(suggestions)
 
 @app.route('/get_degrees', methods=['GET'])
@@ -246,118 +597,551 @@ def get_degrees():
     possible_degrees = degree_map.get(profession, ["Other / Not Applicable", "Any Bachelor's Degree", "Any Master's Degree", "PhD"])
     
     # Filter against the degrees that are actually in the dataset
-    filtered_degrees = [d for d in possible_degrees if d in all_unique_degrees_from_dataset]
+    all_unique_degrees = active_vocabulary()['all_unique_degrees']
+    filtered_degrees = [d for d in possible_degrees if d in all_unique_degrees]
     
     if not filtered_degrees:
         # Fallback if no specific degree matches dataset degrees for the profession
         filtered_degrees = ["Other / Not Applicable"]
     return jsonify({'degrees': filtered_degrees})
 
-def get_final_contributions(shap_values_instance, model_columns, user_input_data):
-    """Gets SHAP contributions for only the specific user-selected values."""
-    raw_contributions = {feature: float(value) for feature, value in zip(model_columns, shap_values_instance)}
-    
-    final_contributions = {}
-    for feature, value in user_input_data.items():
-        # Skip features that are in the exclusion list
-        if feature in excluded_features_from_breakdown:
+def get_final_contributions(shap_values, contribution_index, records):
+    """Gets SHAP contributions for only the specific user-selected values, as one dict per record.
+
+    `shap_values` holds one row per record; see contributions.ContributionIndex.
+    """
+    return contribution_index.percentages(shap_values, [contribution_index.lookup(record) for record in records])
+
+def get_risk_category(risk_score, cutoffs=DEFAULT_RISK_CATEGORY_CUTOFFS):
+    """Maps a 0-10 risk score onto the category and message shown on the result page."""
+    low_cutoff, medium_cutoff = cutoffs
+    if risk_score <= low_cutoff:
+        risk_category = "Low Risk"
+        message = "Your risk score is low. Keep up the good work on maintaining your mental well-being."
+    elif risk_score <= medium_cutoff:
+        risk_category = "Medium Risk"
+        message = "Your risk score is in the medium range. This suggests you may be experiencing some symptoms of stress or other mental health concerns."
+    else:
+        risk_category = "High Risk"
+        message = "Your risk score is high, which indicates a high probability of mental health distress. It is strongly recommended that you seek professional help."
+    return risk_category, message
+
+PEER_NOUNS = {'student': 'students', 'professional': 'working professionals'}
+
+def peer_percentiles(population, risk_score, record):
+    """Ranks a risk score against the surveyed peers; {} when the models came without percentiles."""
+    percentiles = population['percentiles']
+    percentile = None if percentiles is None else percentiles.percentile(population['user_type'], risk_score)
+    if percentile is None:
+        return {}
+    return {
+        'percentile': percentile,
+        'peer_comparison': f"Your risk score is higher than {percentile:.0f}% of the {PEER_NOUNS[population['user_type']]} surveyed.",
+        'cohort_percentiles': percentiles.cohort_percentiles(population['user_type'], risk_score, record),
+    }
+
+def get_population(user_type):
+    """Returns the model, explainer and preprocessing details for 'student' or 'professional'.
+
+    Read it once per request: a model reload swaps in a whole new set, and the
+    dict returned here keeps pointing at the set the request started with.
+    """
+    return model_registry.active['professional' if user_type == 'professional' else 'student']
+
+def active_vocabulary():
+    return model_registry.active['vocabulary']
+
+# Upper bound on the number of rows accepted by a single batch request
+MAX_BATCH_SIZE = 5000
+
+# LRU/TTL cache of scored submissions; MINDCARE_CACHE_SIZE=0 disables it
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get('MINDCARE_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('MINDCARE_CACHE_TTL', 3600)),
+)
+
+# 'sync' (the default) serves one request per worker process and scores it inline;
+# 'threaded' pairs with gunicorn's gthread workers (see gunicorn.conf.py), which serve
+# many connections per process from one copy of the models, and runs the CPU-bound
+# scoring and SHAP work on a pool sized to the cores. Calls beyond
+# MINDCARE_INFERENCE_MAX_PENDING queued or running get a 503 rather than a growing queue.
+SERVING_MODE = os.environ.get('MINDCARE_SERVING_MODE', 'sync')
+inference_pool = InferencePool(
+    max_workers=int(os.environ.get('MINDCARE_INFERENCE_WORKERS', default_max_workers(SERVING_MODE))),
+    max_pending=int(os.environ.get('MINDCARE_INFERENCE_MAX_PENDING', 64)),
+    timeout=float(os.environ.get('MINDCARE_INFERENCE_TIMEOUT', 30)),
+)
+
+# Bounded pool for SHAP breakdowns requested with ?explain=deferred
+explanation_jobs = ExplanationJobs(
+    max_workers=int(os.environ.get('MINDCARE_EXPLAIN_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('MINDCARE_EXPLAIN_MAX_PENDING', 256)),
+    ttl=int(os.environ.get('MINDCARE_EXPLAIN_TTL', 600)),
+)
+
+# Scored single submissions, looked up by the short id in /result/<result_id>.
+# In-process by default; set MINDCARE_RESULT_DB to a SQLite file path to share
+# results between gunicorn workers.
+result_store = make_result_store(
+    db_path=os.environ.get('MINDCARE_RESULT_DB'),
+    ttl=int(os.environ.get('MINDCARE_RESULT_TTL', 3600)),
+)
+
+# Explanation jobs run in the worker that scored them. With MINDCARE_RESULT_DB set,
+# their status and results are also kept in that file, so /explanations/<job_id>
+# answers from any worker; without it, only the scoring worker knows the job.
+shared_explanations = make_result_store(
+    db_path=os.environ.get('MINDCARE_RESULT_DB'),
+    ttl=explanation_jobs.ttl,
+    table='explanations',
+) if os.environ.get('MINDCARE_RESULT_DB') else None
+
+# How often a poll for another worker's job re-reads the shared store
+EXPLANATION_POLL_INTERVAL = 0.25
+
+def share_explanation(job_id):
+    """Records a submitted job as pending in shared_explanations, then its outcome once it finishes."""
+    shared_explanations.put({'status': 'pending'}, result_id=job_id)
+    explanation_jobs.on_done(job_id, lambda status, value: shared_explanations.put({'status': status, 'value': value}, result_id=job_id))
+
+def explanation_status(job_id, wait):
+    """Returns (status, value) as ExplanationJobs.result does, for jobs of any worker."""
+    status, value = explanation_jobs.result(job_id, wait=wait)
+    if status != 'unknown' or shared_explanations is None:
+        return status, value
+    deadline = time.monotonic() + wait
+    while True:
+        shared = shared_explanations.get(job_id)
+        if shared is None:
+            return 'unknown', None
+        if shared['status'] != 'pending' or time.monotonic() >= deadline:
+            return shared['status'], shared.get('value')
+        time.sleep(EXPLANATION_POLL_INTERVAL)
+
+def parse_batch_body():
+    """Reads a JSON array or an NDJSON body into a list of (record, error) pairs."""
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        return [(row, None) for row in data]
+    if data is not None:
+        raise ValueError('Batch body must be a JSON array or newline-delimited JSON objects.')
+
+    rows = []
+    for line in request.get_data(as_text=True).splitlines():
+        if not line.strip():
             continue
+        try:
+            rows.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            rows.append((None, f'Invalid JSON: {e.msg}'))
+    return rows
 
-        # Handle numerical features and binary features directly
-        if feature in raw_contributions:
-            final_contributions[feature] = raw_contributions[feature]
-        # Handle one-hot encoded categorical features
+def explain_records(population, processed, records):
+    """Computes get_final_contributions for already-encoded rows of `records`."""
+    contribution_index = population['contribution_index']
+    lookups = [contribution_index.lookup(record) for record in records]
+    # Only the columns the breakdown reads need SHAP values
+    contribution_columns = {i for _, indices in lookups for i in indices}
+    labels = {'user_type': population['user_type']}
+    with metrics.time('mindcare_stage_duration_seconds', dict(labels, stage='shap')):
+        shap_values = population['explainer'].shap_values(processed, columns=contribution_columns)
+    with metrics.time('mindcare_stage_duration_seconds', dict(labels, stage='contributions')):
+        return contribution_index.percentages(shap_values, lookups)
+
+def run_explanation_job(population, processed, records, labels, cache_entries):
+    contributions = explain_records(population, processed, records)
+    for (key, result), c in zip(cache_entries, contributions):
+        prediction_cache.put(key, dict(result, feature_contributions=c))
+    return [{'index': label, 'feature_contributions': c} for label, c in zip(labels, contributions)]
+
+def score_records(user_type, records, labels=None, deferred=False):
+    """Scores a list of input dicts and returns one result or error entry per record, in input order.
+
+    With deferred=True the SHAP breakdown is queued on the explanation pool instead of
+    computed inline; the returned job id (None if nothing was queued) can be polled at
+    /explanations/<job_id>, whose entries are tagged with `labels` (default: positions).
+    Returns (results, job_id).
+    """
+    population = get_population(user_type)
+    # Reported in the response (X-Model-Version) so clients can tell which models scored them
+    g.model_version = population['model_version']
+    results = [None] * len(records)
+    labels = list(range(len(records))) if labels is None else labels
+
+    valid_positions = []
+    for pos, record in enumerate(records):
+        if isinstance(record, dict):
+            valid_positions.append(pos)
         else:
-            # Iterate through raw_contributions to find matching one-hot encoded columns
-            for one_hot_col in raw_contributions.keys():
-                if one_hot_col.startswith(f"{feature}_"):
-                    # Check if the one-hot encoded column corresponds to the user's selected value
-                    if one_hot_col == f"{feature}_{value}":
-                        final_contributions[feature] = raw_contributions[one_hot_col]
-                        break # Found the specific one-hot feature, move to next user input feature
-
-    # Scale the contributions to a percentage, only considering the included features
-    total_abs_shap = sum(abs(v) for v in final_contributions.values())
-    if total_abs_shap > 0:
-        signed_percentages = {k: (v / total_abs_shap) * 100 for k, v in final_contributions.items()}
-    else:
-        signed_percentages = {k: 0 for k in final_contributions.keys()}
-        
-    return signed_percentages
+            results[pos] = {'error': 'Each record must be a JSON object.'}
 
-@app.route('/predict/student', methods=['POST'])
-def predict_student():
+    # Repeat submissions are served from the cache without encoding, scoring or SHAP
+    cache_keys = {}
+    uncached_positions = []
+    with metrics.time('mindcare_stage_duration_seconds', {'user_type': user_type, 'stage': 'cache_lookup'}):
+        for pos in valid_positions:
+            cache_keys[pos] = PredictionCache.make_key(user_type, population['model_version'], records[pos])
+            cached = prediction_cache.get(cache_keys[pos])
+            if cached is not None:
+                results[pos] = cached
+            else:
+                uncached_positions.append(pos)
+    valid_positions = uncached_positions
+
+    valid_records = [records[pos] for pos in valid_positions]
+    with metrics.time('mindcare_stage_duration_seconds', {'user_type': user_type, 'stage': 'encode'}):
+        processed, encoded_positions, errors = population['encoder'].encode_batch(valid_records)
+    for pos, message in errors.items():
+        results[valid_positions[pos]] = {'error': message}
+
+    # Unrecognised binary values (e.g. Gender) or missing numbers leave NaNs the model cannot score
+    invalid = np.isnan(processed).any(axis=1)
+    for row_num in np.flatnonzero(invalid):
+        bad_cols = [population['columns'][i] for i in np.flatnonzero(np.isnan(processed[row_num]))]
+        results[valid_positions[encoded_positions[row_num]]] = {'error': f'Error during data preprocessing: invalid or missing values for {", ".join(bad_cols)}'}
+    processed = processed[~invalid]
+    encoded_positions = [pos for pos, bad in zip(encoded_positions, invalid) if not bad]
+
+    job_id = None
+    if encoded_positions:
+        with metrics.time('mindcare_stage_duration_seconds', {'user_type': user_type, 'stage': 'predict_proba'}):
+            risk_scores = inference_pool.run(population['predictor'].predict_proba, processed)[:, 1] * 10
+        metrics.inc('mindcare_scored_rows_total', {'user_type': user_type}, amount=len(encoded_positions))
+        scored_records = [valid_records[pos] for pos in encoded_positions]
+
+        scored_results = []
+        for row_num in range(len(encoded_positions)):
+            risk_score = round(float(risk_scores[row_num]), 2)
+            risk_category, message = get_risk_category(risk_score, population['risk_category_cutoffs'])
+            scored_results.append({
+                'risk_score': risk_score,
+                'risk_category': risk_category,
+                'message': message,
+                **peer_percentiles(population, risk_score, scored_records[row_num]),
+            })
+        cache_entries = [(cache_keys[valid_positions[pos]], result) for pos, result in zip(encoded_positions, scored_results)]
+
+        if deferred:
+            scored_labels = [labels[valid_positions[pos]] for pos in encoded_positions]
+            with metrics.time('mindcare_stage_duration_seconds', {'user_type': user_type, 'stage': 'explain_submit'}):
+                job_id = explanation_jobs.submit(run_explanation_job, population, processed, scored_records, scored_labels, cache_entries)
+                if job_id is not None and shared_explanations is not None:
+                    share_explanation(job_id)
+        if job_id is None:
+            # Not deferred, or the explanation queue is full: explain inline
+            contributions = inference_pool.run(explain_records, population, processed, scored_records)
+            for (key, result), c in zip(cache_entries, contributions):
+                result['feature_contributions'] = c
+                prediction_cache.put(key, result)
+
+        for pos, result in zip(encoded_positions, scored_results):
+            results[valid_positions[pos]] = result
+    return results, job_id
+
+def inference_busy_response(e):
+    """503 for a request the inference pool could not take; clients should retry shortly."""
+    response = jsonify({'error': f'The service is busy ({e}). Please try again shortly.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def predict_single(user_type):
+    g.user_type = user_type
     data = request.get_json()
+    deferred = request.args.get('explain') == 'deferred'
     try:
-        user_df = pd.DataFrame([data], index=[0])
-        processed_data = preprocess_student_data(user_df.copy(), students_cols, student_scaler)
-        if processed_data.empty or processed_data.shape[1] != len(students_cols):
-            return jsonify({'error': 'Error processing input data: Feature shape mismatch.'}), 400
+        results, job_id = score_records(user_type, [data], deferred=deferred)
+        result = results[0]
+    except InferenceBusy as e:
+        return inference_busy_response(e)
     except Exception as e:
         return jsonify({'error': f'Error during data preprocessing: {str(e)}'}), 400
+    if 'error' in result:
+        return jsonify({'error': result['error']}), 400
 
-    risk_score = best_model_students.predict_proba(processed_data)[:, 1] * 10
-    risk_score = round(float(risk_score[0]), 2)
+    stored = {
+        'user_type': user_type,
+        'risk_score': result['risk_score'],
+        'risk_category': result['risk_category'],
+        'message': result['message'],
+        'feature_contributions': result.get('feature_contributions'),
+        'job_id': job_id,
+        'peer_comparison': result.get('peer_comparison'),
+    }
+    result_id = result_store.put(stored)
+    if job_id is not None:
+        # The result page outlives the job (and may be served by another worker), so
+        # the breakdown is written back into the stored result once it is ready
+        def store_contributions(status, value):
+            if status == 'done':
+                result_store.update(result_id, {'feature_contributions': value[0]['feature_contributions'], 'job_id': None})
+        explanation_jobs.on_done(job_id, store_contributions)
+    response = {
+        'risk_score': result['risk_score'],
+        'risk_category': result['risk_category'],
+        'message': result['message'],
+        'result_id': result_id,
+        'redirect_url': url_for('stored_result', result_id=result_id),
+        **{key: result[key] for key in ('percentile', 'peer_comparison', 'cohort_percentiles') if key in result},
+        'model_version': g.model_version,
+    }
+    if job_id is not None:
+        response['job_id'] = job_id
+        response['explanation_url'] = url_for('get_explanation', job_id=job_id)
+    # ?inline=1 returns the rendered result page as well, saving the client the redirect
+    if request.args.get('inline') == '1':
+        response['html'] = render_result_page(stored)
+    return jsonify(response)
 
-    shap_values = student_explainer.shap_values(processed_data)
-    if isinstance(shap_values, list):
-        shap_values_instance = shap_values[1][0]
-    else:
-        shap_values_instance = shap_values[0]
+def predict_batch(user_type):
+    g.user_type = user_type
+    try:
+        rows = parse_batch_body()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(rows) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large: {len(rows)} rows (maximum is {MAX_BATCH_SIZE}).'}), 413
+    deferred = request.args.get('explain') == 'deferred'
 
-    feature_contributions = get_final_contributions(shap_values_instance, students_cols, data)
+    results = [None] * len(rows)
+    parsed_positions = [pos for pos, (_, error) in enumerate(rows) if error is None]
+    for pos, (_, error) in enumerate(rows):
+        if error is not None:
+            results[pos] = {'error': error}
+    try:
+        scored, job_id = score_records(user_type, [rows[pos][0] for pos in parsed_positions], labels=parsed_positions, deferred=deferred)
+    except InferenceBusy as e:
+        return inference_busy_response(e)
+    except Exception as e:
+        return jsonify({'error': f'Error during batch prediction: {str(e)}'}), 400
+    for pos, entry in zip(parsed_positions, scored):
+        results[pos] = entry
 
-    if risk_score <= 4:
-        risk_category = "Low Risk"
-        message = "Your risk score is low. Keep up the good work on maintaining your mental well-being."
-    elif risk_score <= 7:
-        risk_category = "Medium Risk"
-        message = "Your risk score is in the medium range. This suggests you may be experiencing some symptoms of stress or other mental health concerns."
-    else:
-        risk_category = "High Risk"
-        message = "Your risk score is high, which indicates a high probability of mental health distress. It is strongly recommended that you seek professional help."
+    for pos, entry in enumerate(results):
+        entry['index'] = pos
+    response = {
+        'user_type': user_type,
+        'count': len(results),
+        'error_count': sum(1 for entry in results if 'error' in entry),
+        'model_version': g.get('model_version'),
+        'results': results,
+    }
+    if job_id is not None:
+        response['job_id'] = job_id
+        response['explanation_url'] = url_for('get_explanation', job_id=job_id)
+    return jsonify(response)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    snapshots = [
+        ('mindcare_ready', 'gauge', 'Whether the models and vocabulary are loaded (1) or not (0).', int(warmup_state['ready']), None),
+        ('mindcare_model_load_seconds', 'gauge', 'Time taken to load the models, scalers and explainers.', warmup_state['model_load_seconds'], None),
+        ('mindcare_warmup_seconds', 'gauge', 'Time taken by the whole warmup, including the vocabulary.', warmup_state['warmup_seconds'], None),
+    ]
+    if warmup_state['ready']:
+        snapshots.append(('mindcare_model_info', 'gauge', 'Content hash of the loaded model artifacts.', 1, {'model_version': model_registry.active['version']}))
+        snapshots.append(('mindcare_model_loaded_at_seconds', 'gauge', 'Unix time the active models were loaded.', model_registry.loaded_at, None))
+    snapshots += [
+        ('mindcare_model_reloads_total', 'counter', 'Model reloads since startup, by outcome.', model_registry.reloads, {'outcome': 'success'}),
+        ('mindcare_model_reloads_total', 'counter', 'Model reloads since startup, by outcome.', model_registry.failed_reloads, {'outcome': 'error'}),
+    ]
+    cache = prediction_cache.stats()
+    snapshots += [
+        ('mindcare_cache_entries', 'gauge', 'Entries in the prediction cache.', cache['size'], None),
+        ('mindcare_cache_max_entries', 'gauge', 'Capacity of the prediction cache.', cache['max_size'], None),
+        ('mindcare_cache_hits_total', 'counter', 'Prediction cache hits.', cache['hits'], None),
+        ('mindcare_cache_misses_total', 'counter', 'Prediction cache misses.', cache['misses'], None),
+        ('mindcare_cache_evictions_total', 'counter', 'Prediction cache evictions and expiries.', cache['evictions'], None),
+    ]
+    jobs = explanation_jobs.stats()
+    snapshots += [
+        ('mindcare_explanation_jobs_pending', 'gauge', 'Deferred explanation jobs queued or running.', jobs['pending'], None),
+        ('mindcare_explanation_jobs_stored', 'gauge', 'Deferred explanation jobs held for polling.', jobs['stored'], None),
+        ('mindcare_explanation_jobs_max_pending', 'gauge', 'Deferred explanation jobs accepted before falling back to inline.', jobs['max_pending'], None),
+    ]
+    pool = inference_pool.stats()
+    snapshots += [
+        ('mindcare_inference_workers', 'gauge', 'Threads scoring requests (0: inline, in the request thread).', pool['max_workers'], None),
+        ('mindcare_inference_in_flight', 'gauge', 'Inference calls queued or running on the pool.', pool['in_flight'], None),
+        ('mindcare_inference_max_pending', 'gauge', 'Inference calls accepted before answering 503.', pool['max_pending'], None),
+        ('mindcare_inference_rejected_total', 'counter', 'Inference calls refused because the pool was full.', pool['rejected'], None),
+        ('mindcare_inference_timeouts_total', 'counter', 'Inference calls that outlasted MINDCARE_INFERENCE_TIMEOUT.', pool['timed_out'], None),
+    ]
+    return Response(metrics.render(snapshots), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    with stored_profiles_lock:
+        profile = stored_profiles.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Unknown or expired profile id'}), 404
+    return Response(profile, content_type='text/plain; charset=utf-8')
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(dict(prediction_cache.stats(), model_version=model_registry.active['version']))
+
+# Bearer token for /admin/* routes; they answer 404 while it is unset
+ADMIN_TOKEN = os.environ.get('MINDCARE_ADMIN_TOKEN', '')
+
+def is_admin_request():
+    supplied = request.headers.get('Authorization', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {ADMIN_TOKEN}'.encode('utf-8'))
+
+@app.route('/admin/reload-models', methods=['POST'])
+def reload_models():
+    """Reloads the models in this worker without a restart.
+
+    With ?wait=1 the response comes once the new set is active (200) or the reload
+    failed (500); otherwise it is 202 and the reload runs in the background. Only the
+    worker that receives the request reloads; set MINDCARE_MODEL_WATCH_INTERVAL to
+    have every worker pick up new artifact files by itself.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    previous_version = model_registry.active['version']
+    if model_registry.reloading:
+        return jsonify({'status': 'in_progress', 'model_version': previous_version}), 409
+    if request.args.get('wait') != '1':
+        model_registry.reload_in_background()
+        return jsonify({'status': 'reloading', 'model_version': previous_version}), 202
+    if not model_registry.reload():
+        return jsonify({'status': 'failed', 'model_version': previous_version, 'error': model_registry.last_error}), 500
+    return jsonify({'status': 'reloaded', 'previous_model_version': previous_version,
+                    'model_version': model_registry.active['version'], 'load_seconds': model_registry.load_seconds})
+
+# Longest a client may block on /explanations/<job_id>?wait=<seconds>
+MAX_EXPLANATION_WAIT = 30
+
+@app.route('/explanations/<job_id>', methods=['GET'])
+def get_explanation(job_id):
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_EXPLANATION_WAIT)
+    status, value = explanation_status(job_id, wait)
+    if status == 'unknown':
+        return jsonify({'job_id': job_id, 'status': status, 'error': 'Unknown or expired job id'}), 404
+    if status == 'error':
+        return jsonify({'job_id': job_id, 'status': status, 'error': value}), 500
+    if status == 'pending':
+        return jsonify({'job_id': job_id, 'status': status}), 202
+
+    response = {'job_id': job_id, 'status': status, 'results': value}
+    if len(value) == 1:
+        response['feature_contributions'] = value[0]['feature_contributions']
+    return jsonify(response)
+
+# Upper bound on the number of answer pairs one what-if request may ask for
+MAX_WHAT_IF_PAIRS = 10
+
+def parse_what_if_pairs(data, sweep, user_type):
+    """Returns the (feature, feature) pairs a what-if request asked for, or the population's defaults."""
+    if 'pairs' not in data:
+        return [pair for pair in default_what_if_pairs[user_type] if all(f in sweep.features for f in pair)]
+    pairs = data['pairs']
+    if not isinstance(pairs, list) or len(pairs) > MAX_WHAT_IF_PAIRS:
+        raise ValueError(f'"pairs" must be a list of at most {MAX_WHAT_IF_PAIRS} [feature, feature] pairs.')
+    for pair in pairs:
+        if not isinstance(pair, list) or len(pair) != 2 or pair[0] == pair[1]:
+            raise ValueError('Each pair must name two different features.')
+        unknown = [f for f in pair if f not in sweep.features]
+        if unknown:
+            raise ValueError(f'Cannot vary {", ".join(map(str, unknown))}; choose from {", ".join(sweep.features)}.')
+    return list(dict.fromkeys(tuple(pair) for pair in pairs))
+
+def what_if(user_type):
+    """Scores a profile and every variant of it with one or two actionable answers changed.
+
+    The body is {"profile": {...}, "pairs": [[feature, feature], ...]}, where profile is
+    what /predict/<user_type> takes and pairs is optional. The encoded profile and all
+    of its variants are scored together in one predict_proba call.
+    """
+    g.user_type = user_type
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('profile'), dict):
+        return jsonify({'error': 'Body must be a JSON object with a "profile" object.'}), 400
+    profile = data['profile']
+    population = get_population(user_type)
+    g.model_version = population['model_version']
+    sweep = population['what_if']
+    try:
+        pairs = parse_what_if_pairs(data, sweep, user_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        row = population['encoder'].encode(profile)[0]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Error during data preprocessing: {str(e)}'}), 400
+    if np.isnan(row).any():
+        bad_cols = [population['columns'][i] for i in np.flatnonzero(np.isnan(row))]
+        return jsonify({'error': f'Error during data preprocessing: invalid or missing values for {", ".join(bad_cols)}'}), 400
 
+    matrix, changes = sweep.grid(row, pairs)
+    with metrics.time('mindcare_stage_duration_seconds', {'user_type': user_type, 'stage': 'what_if_predict_proba'}):
+        try:
+            risk_scores = inference_pool.run(population['predictor'].predict_proba, matrix)[:, 1] * 10
+        except InferenceBusy as e:
+            return inference_busy_response(e)
+    metrics.inc('mindcare_scored_rows_total', {'user_type': user_type}, amount=len(matrix))
+
+    base_score = float(risk_scores[0])
+    risk_category, message = get_risk_category(round(base_score, 2), population['risk_category_cutoffs'])
+    features = {feature: {'current': profile.get(feature), 'alternatives': []} for feature in sweep.features}
+    pair_results = {pair: {'features': list(pair), 'alternatives': []} for pair in pairs}
+    for change, risk_score in zip(changes, risk_scores[1:].tolist()):
+        entry = {'risk_score': round(risk_score, 2), 'change': round(risk_score - base_score, 2)}
+        if len(change) == 1:
+            (feature, value), = change.items()
+            features[feature]['alternatives'].append(dict(entry, value=value))
+        else:
+            pair_results[tuple(change)]['alternatives'].append(dict(entry, values=change))
     return jsonify({
-        'redirect_url': url_for('result', risk_score=risk_score, risk_category=risk_category, message=message, user_type='student', feature_contributions=json.dumps(feature_contributions))
+        'risk_score': round(base_score, 2),
+        'risk_category': risk_category,
+        'message': message,
+        'features': features,
+        'pairs': list(pair_results.values()),
+        'model_version': g.model_version,
     })
 
+@app.route('/predict/student', methods=['POST'])
+def predict_student():
+    return predict_single('student')
+
 @app.route('/predict/professional', methods=['POST'])
 def predict_professional():
-    data = request.get_json()
-    try:
-        user_df = pd.DataFrame([data], index=[0])
-        processed_data = preprocess_professional_data(user_df.copy(), professionals_cols, professional_scaler)
-        if processed_data.empty or processed_data.shape[1] != len(professionals_cols):
-             return jsonify({'error': 'Error processing input data: Feature shape mismatch.'}), 400
-    except Exception as e:
-        return jsonify({'error': f'Error during data preprocessing: {str(e)}'}), 400
+    return predict_single('professional')
 
+@app.route('/predict/student/batch', methods=['POST'])
+def predict_student_batch():
+    return predict_batch('student')
 
-    risk_score = best_model_professionals.predict_proba(processed_data)[:, 1] * 10
-    risk_score = round(float(risk_score[0]), 2)
+@app.route('/predict/professional/batch', methods=['POST'])
+def predict_professional_batch():
+    return predict_batch('professional')
 
-    shap_values = professional_explainer.shap_values(processed_data)
-    if isinstance(shap_values, list):
-        shap_values_instance = shap_values[1][0]
-    else:
-        shap_values_instance = shap_values[0]
-        
-    feature_contributions = get_final_contributions(shap_values_instance, professionals_cols, data)
+@app.route('/predict/student/what-if', methods=['POST'])
+def predict_student_what_if():
+    return what_if('student')
 
-    if risk_score <= 4:
-        risk_category = "Low Risk"
-        message = "Your risk score is low. Keep up the good work on maintaining your mental well-being."
-    elif risk_score <= 7:
-        risk_category = "Medium Risk"
-        message = "Your risk score is in the medium range. This suggests you may be experiencing some symptoms of stress or other mental health concerns."
-    else:
-        risk_category = "High Risk"
-        message = "Your risk score is high, which indicates a high probability of mental health distress. It is strongly recommended that you seek professional help."
+@app.route('/predict/professional/what-if', methods=['POST'])
+def predict_professional_what_if():
+    return what_if('professional')
 
-    return jsonify({
-        'redirect_url': url_for('result', risk_score=risk_score, risk_category=risk_category, message=message, user_type='professional', feature_contributions=json.dumps(feature_contributions))
-    })
+def render_result_page(stored):
+    return render_template('result.html', risk_score=stored['risk_score'], risk_category=stored['risk_category'],
+                           message=stored['message'], user_type=stored['user_type'],
+                           feature_contributions=json.dumps(stored['feature_contributions'] or {}),
+                           job_id=stored['job_id'] or '', peer_comparison=stored.get('peer_comparison'))
+
+@app.route('/result/<result_id>')
+def stored_result(result_id):
+    stored = result_store.get(result_id)
+    if stored is None:
+        return jsonify({'error': 'Unknown or expired result id. Please fill in the form again.'}), 404
+    return render_result_page(stored)
 
+# Renders a result passed entirely in the query string, as links made before /result/<result_id> did
 @app.route('/result')
 def result():
     risk_score = request.args.get('risk_score', 0, type=float)
@@ -365,7 +1149,8 @@ def result():
     message = request.args.get('message', 'No message provided.')
     user_type = request.args.get('user_type', 'student')
     feature_contributions = request.args.get('feature_contributions', '{}')
-    return render_template('result.html', risk_score=risk_score, risk_category=risk_category, message=message, user_type=user_type, feature_contributions=feature_contributions)
+    job_id = request.args.get('job_id', '')
+    return render_template('result.html', risk_score=risk_score, risk_category=risk_category, message=message, user_type=user_type, feature_contributions=feature_contributions, job_id=job_id)
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
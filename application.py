@@ -1,26 +1,16 @@
-import streamlit as st
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from PIL import Image
 import base64
-from sklearn.model_selection import train_test_split,GridSearchCV
-
-df = pd.read_csv("final_depression_dataset_1.csv")
+import os
 
-# Separate the dataset into students and professionals
-students_df = df[df['Working Professional or Student'] == "Student"].copy()
-professionals_df = df[df['Working Professional or Student'] == "Working Professional"].copy()
+import numpy as np
+import streamlit as st
 
-# Drop unnecessary columns
-students_df = students_df.drop(columns=["Work Pressure", "Profession", "Job Satisfaction"])
-professionals_df = professionals_df.drop(columns=["Academic Pressure", "CGPA", "Study Satisfaction"])
+# app.py builds its model set (encoders, forests, vocabulary) when it is imported
+os.environ['MINDCARE_LAZY_LOAD'] = '0'
 
-# Drop rows with missing values
-students_df = students_df.dropna()
-professionals_df = professionals_df.dropna()
+base_dir = os.path.dirname(os.path.abspath(__file__))
+IMAGE_PATH = os.path.join(base_dir, 'static', 'mental_health_image.jpg')
 
-# Define columns and encoding details
+# Form fields, in display order
 students_columns = ['Name', 'Gender', 'Age', 'City', 'Academic Pressure', 'Have you ever had suicidal thoughts ?', 
                     'Family History of Mental Illness', 'Study Satisfaction', 'Dietary Habits', 'Sleep Duration', 
                     'Degree', 'CGPA', 'Work/Study Hours', 'Financial Stress']
@@ -28,59 +18,90 @@ prof_columns = ['Name', 'Gender', 'Age', 'City', 'Work Pressure', 'Have you ever
                 'Family History of Mental Illness', 'Job Satisfaction', 'Dietary Habits', 'Sleep Duration', 
                 'Degree', 'Work/Study Hours', 'Financial Stress', 'Profession']
 
-binary_columns_students = ['Gender', 'Have you ever had suicidal thoughts ?', 'Family History of Mental Illness']
-non_binary_columns_students = ['City', 'Dietary Habits', 'Sleep Duration', 'Degree']
-binary_columns_professionals = ['Gender', 'Have you ever had suicidal thoughts ?', 'Family History of Mental Illness']
-non_binary_columns_professionals = ['City', 'Dietary Habits', 'Sleep Duration', 'Degree', 'Profession']
-
-# Label encoding for binary columns and one-hot encoding for non-binary columns
-
-label_encoder = LabelEncoder()
-for col in binary_columns_students:
-    students_df[col] = label_encoder.fit_transform(students_df[col])
-students_df = pd.get_dummies(students_df, columns=non_binary_columns_students)
-
-for col in binary_columns_professionals:
-    professionals_df[col] = label_encoder.fit_transform(professionals_df[col])
-professionals_df = pd.get_dummies(professionals_df, columns=non_binary_columns_professionals)
-
-
-X_students = students_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-y_students = label_encoder.fit_transform(students_df["Depression"])
-X_professionals = professionals_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-y_professionals = label_encoder.fit_transform(professionals_df["Depression"])
-
-# Split the data into training and test sets for both categories
-X_train_students, X_test_students, y_train_students, y_test_students = train_test_split(
-    X_students, y_students, test_size=0.2, random_state=42
-)
-X_train_pro, X_test_pro, y_train_pro, y_test_pro = train_test_split(
-    X_professionals, y_professionals, test_size=0.3, random_state=42
-)
-
-# Define a parameter grid for grid search
-param_grid = {
-    'n_estimators': [10,20,30,40,50],  
-    'max_depth': [5,10],      
-    'min_samples_split': [2,3,4]
+# Numeric inputs: (min, max, default, step)
+NUMBER_INPUTS = {
+    'Age': (15, 65, 25, 1),
+    'CGPA': (0.0, 10.0, 7.0, 0.01),
+    'Work/Study Hours': (0, 20, 8, 1),
 }
-# Grid search with class weights for students
-grid_search_stu = GridSearchCV(RandomForestClassifier(class_weight='balanced', random_state=42), param_grid, cv=5)
-grid_search_stu.fit(X_train_students, y_train_students)
-best_model_students = grid_search_stu.best_estimator_
 
-grid_search_pro = GridSearchCV(RandomForestClassifier(class_weight='balanced', random_state=42), param_grid, cv=5)
-grid_search_pro.fit(X_train_pro, y_train_pro)
-best_model_professionals = grid_search_pro.best_estimator_
 
-# # Train the models
-# X_students = students_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-# y_students = label_encoder.fit_transform(students_df["Depression"])
-# best_model_students = RandomForestClassifier(class_weight='balanced', random_state=42).fit(X_students, y_students)
+# Streamlit re-runs this script on every widget interaction. Everything below is
+# cached per server process and shared by all sessions, so a rerun only encodes and
+# scores one row; the models are trained by train_models.py, never here.
+@st.cache_resource(show_spinner="Loading models...")
+def load_models():
+    """Returns the model set the Flask app serves from models/ (see app.load_models)."""
+    import app
+    return app.model_registry.active
+
+
+@st.cache_resource
+def form_options(user_type):
+    """Returns {feature: choices} for the population's dropdowns.
+
+    City, Degree and Profession offer the vocabulary the Flask forms use; the other
+    categorical answers offer the values the model has a one-hot column for, so every
+    choice is one the encoder recognises.
+    """
+    import app
+    from feature_encoder import BINARY_MAPS
+
+    models = load_models()
+    vocabulary = models['vocabulary']
+    columns = models[user_type]['columns']
+    categorical_cols = app.student_categorical_cols if user_type == 'student' else app.professional_categorical_cols
+    options = {feature: [col[len(feature) + 1:] for col in columns if col.startswith(f"{feature}_")] for feature in categorical_cols}
+    options.update({feature: list(mapping) for feature, mapping in BINARY_MAPS.items()})
+    options['City'] = vocabulary['unique_cities']
+    if user_type == 'student':
+        options['Degree'] = vocabulary['unique_student_degrees']
+    else:
+        options['Degree'] = vocabulary['all_unique_degrees']
+        options['Profession'] = vocabulary['unique_professions']
+    return options
+
+
+@st.cache_data
+def get_image_base64(image_path):
+    with open(image_path, "rb") as img_file:
+        return base64.b64encode(img_file.read()).decode()
+
+
+def predict_risk_score(user_type, data):
+    """Scores one form submission with the population's FeatureEncoder and predictor, as POST /predict/<user_type> does.
 
-# X_professionals = professionals_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-# y_professionals = label_encoder.fit_transform(professionals_df["Depression"])
-# best_model_professionals = RandomForestClassifier(class_weight='balanced', random_state=42).fit(X_professionals, y_professionals)
+    Returns the 0-10 risk score, or None if an answer could not be encoded.
+    """
+    population = load_models()[user_type]
+    processed = population['encoder'].encode(data)
+    if np.isnan(processed).any():
+        return None
+    return float(population['predictor'].predict_proba(processed)[0, 1] * 10)
+
+
+def render_form(user_type, features):
+    """Renders the population's inputs and returns the answers as a request dict."""
+    options = form_options(user_type)
+    data = {}
+    for feature in features:
+        key = f"{user_type}_{feature}"
+        if feature == "Name":
+            data[feature] = st.text_input("Name", key=key)
+        elif feature in NUMBER_INPUTS:
+            min_value, max_value, value, step = NUMBER_INPUTS[feature]
+            data[feature] = st.number_input(feature, min_value=min_value, max_value=max_value, value=value, step=step, key=key)
+        else:
+            data[feature] = st.selectbox(feature, options[feature], key=key)
+    return data
+
+
+def show_risk_score(user_type, data):
+    risk_score = predict_risk_score(user_type, data)
+    if risk_score is None:
+        st.error("Some answers are missing or invalid. Please check the form and try again.")
+    else:
+        show_prediction_page(risk_score)
 
 # Define the Streamlit app
 def main():
@@ -166,14 +187,7 @@ def main():
         st.title("MindCare")
         st.subheader("Mental Health Prediction Platform")
 
-        # Function to load image
-        def get_image_base64(image_path):
-            with open(image_path, "rb") as img_file:
-                return base64.b64encode(img_file.read()).decode()
-
-       
-        image_path = "mental_health_image.jpg"
-        image_base64 = get_image_base64(image_path)
+        image_base64 = get_image_base64(IMAGE_PATH)
         st.markdown(
             f"""
             <div class="flex-container">
@@ -230,46 +244,18 @@ def main():
     # Student Page
     with tab2:
         st.header("Student Mental Health Prediction")
-        student_data = {}
-        for feature in students_columns:
-            if feature == "Name":
-                student_data[feature] = st.text_input("Name",key="student_name")
-            elif feature == "City":
-                student_data[feature] = st.text_input("City",key="student_city")
-            elif feature == "CGPA":
-                student_data[feature] = st.text_input("CGPA")
-            elif feature == "Age":
-                student_data[feature] = st.text_input("Age",key="student_age")
-            else:
-                student_data[feature] = st.selectbox(feature, df[feature].unique(),key="student"+feature)
+        student_data = render_form('student', students_columns)
 
         if st.button("Predict", key="student_predict"):
-            student_df = pd.DataFrame([student_data])
-            student_df = preprocess_student_data(student_df, X_students.columns)
-            risk_score = best_model_students.predict_proba(student_df)[:, 1] * 10
-            show_prediction_page(risk_score[0])
+            show_risk_score('student', student_data)
 
     # Working Professional Page
     with tab3:
         st.header("Professional Mental Health Prediction")
-        professional_data = {}
-        for feature in prof_columns:
-            if feature == "Name":
-                professional_data[feature] = st.text_input("Name",key="professional_name")
-            elif feature == "City":
-                professional_data[feature] = st.text_input("City",key="professional_city")
-            elif feature == "Age":
-                professional_data[feature] = st.text_input("Age",key="professional_age")
-            elif feature == "Profession":
-                professional_data[feature] = st.text_input("Profession")    
-            else:
-                professional_data[feature] = st.selectbox(feature, df[feature].unique(),key="professional"+feature)
+        professional_data = render_form('professional', prof_columns)
 
         if st.button("Predict", key="professional_predict"):
-            professional_df = pd.DataFrame([professional_data])
-            professional_df = preprocess_professional_data(professional_df, X_professionals.columns)
-            risk_score = best_model_professionals.predict_proba(professional_df)[:, 1] * 10
-            show_prediction_page(risk_score[0])
+            show_risk_score('professional', professional_data)
     with tab4:
         st.title("Mental Health Resources")
         st.write("Explore helpful articles and resources on mental health:")
@@ -304,28 +290,6 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-def preprocess_student_data(df, required_columns):
-    df = df.drop(columns=["Name"])
-    for col in ["Have you ever had suicidal thoughts ?", "Family History of Mental Illness"]:
-        df[col] = df[col].map({"Yes": 1, "No": 0})
-    df["Gender"] = df["Gender"].map({"Male": 1, "Female": 0})
-    df = pd.get_dummies(df, columns=["City", "Dietary Habits", "Sleep Duration", "Degree"])
-    for col in required_columns:
-        if col not in df.columns:
-            df[col] = 0
-    return df[required_columns]
-
-def preprocess_professional_data(df, required_columns):
-    df = df.drop(columns=["Name"])
-    for col in ["Have you ever had suicidal thoughts ?", "Family History of Mental Illness"]:
-        df[col] = df[col].map({"Yes": 1, "No": 0})
-    df["Gender"] = df["Gender"].map({"Male": 1, "Female": 0})
-    df = pd.get_dummies(df, columns=["City", "Dietary Habits", "Sleep Duration", "Degree", "Profession"])
-    for col in required_columns:
-        if col not in df.columns:
-            df[col] = 0
-    return df[required_columns]
-
 def show_prediction_page(risk_score):
     pulse_css = f"""
     <style>
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Every benchmark in this file runs against the real models, so turn the prediction
+# cache off before app.py is imported; otherwise repeat payloads would be cache hits
+os.environ['MINDCARE_CACHE_SIZE'] = '0'
+os.environ['MINDCARE_LAZY_LOAD'] = '0'
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(base_dir, 'final_depression_dataset_1.csv')
+RESULTS_FORMAT_VERSION = 1
+
+# A benchmark regresses when its median is this much slower than the baseline's...
+DEFAULT_TOLERANCE = 0.25
+# ...and the slowdown is larger than this many milliseconds (timer noise on tiny stages)
+NOISE_FLOOR_MS = 0.05
+
+
+def measure(fn, repeat, warmup=1):
+    """Calls fn() `warmup` times untimed and `repeat` times timed; returns millisecond stats."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.array(samples)
+    return {
+        'n': int(len(samples)),
+        'min_ms': float(samples.min()),
+        'median_ms': float(np.median(samples)),
+        'mean_ms': float(samples.mean()),
+        'p95_ms': float(np.percentile(samples, 95)),
+    }
+
+
+def synthetic_payloads(columns, numerical_cols, categorical_cols, n, seed=0):
+    """Builds n form submissions whose categorical answers are read off the model's one-hot columns."""
+    from feature_encoder import BINARY_MAPS
+
+    rng = np.random.default_rng(seed)
+    choices = {}
+    for feature in categorical_cols:
+        prefix = f"{feature}_"
+        choices[feature] = [col[len(prefix):] for col in columns if col.startswith(prefix)]
+    numerical_ranges = {'Age': (18, 60), 'CGPA': (5.0, 10.0), 'Work/Study Hours': (0, 12)}
+
+    payloads = []
+    for i in range(n):
+        payload = {'Name': f'Benchmark {i}'}
+        for feature, mapping in BINARY_MAPS.items():
+            payload[feature] = str(rng.choice(list(mapping)))
+        for feature in numerical_cols:
+            lo, hi = numerical_ranges[feature]
+            payload[feature] = round(float(rng.uniform(lo, hi)), 2) if feature == 'CGPA' else int(rng.integers(lo, hi + 1))
+        for feature, values in choices.items():
+            payload[feature] = str(rng.choice(values))
+        payloads.append(payload)
+    return payloads
+
+
+def bench_serving(repeat, batch_size):
+    """Times the /predict request path stage by stage, for one row and for a batch, per population."""
+    import pandas as pd
+    import app
+
+    # The pandas reference path inserts one-hot columns one at a time
+    warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+    client = app.app.test_client()
+    populations = {
+        'student': (app.preprocess_student_data, app.student_numerical_cols, app.student_categorical_cols),
+        'professional': (app.preprocess_professional_data, app.professional_numerical_cols, app.professional_categorical_cols),
+    }
+    results = {}
+    for user_type, (preprocess, numerical_cols, categorical_cols) in populations.items():
+        population = app.get_population(user_type)
+        columns = population['columns']
+        payloads = synthetic_payloads(columns, numerical_cols, categorical_cols, max(batch_size, 1))
+        payload = payloads[0]
+        prefix = f'serving.{user_type}'
+
+        # Single submission, stage by stage
+        results[f'{prefix}.single.preprocess_pandas'] = measure(
+            lambda: preprocess(pd.DataFrame([payload]), columns, population['scaler']), repeat)
+        results[f'{prefix}.single.preprocess'] = measure(lambda: population['encoder'].encode(payload), repeat)
+        row = population['encoder'].encode(payload)
+        if population['model'] is not None:
+            results[f'{prefix}.single.predict_proba'] = measure(lambda: population['model'].predict_proba(row), repeat)
+        results[f'{prefix}.single.predict_engine'] = measure(lambda: population['predictor'].predict_proba(row), repeat)
+        contribution_columns = set(population['contribution_index'].lookup(payload)[1])
+        results[f'{prefix}.single.shap'] = measure(
+            lambda: population['explainer'].shap_values(row, columns=contribution_columns), repeat)
+        shap_row = population['explainer'].shap_values(row)
+        results[f'{prefix}.single.final_contributions'] = measure(
+            lambda: app.get_final_contributions(shap_row, population['contribution_index'], [payload]), repeat)
+        results[f'{prefix}.single.end_to_end'] = measure(
+            lambda: client.post(f'/predict/{user_type}', json=payload), repeat)
+
+        # One batch request of batch_size rows
+        if batch_size > 0:
+            batch = payloads[:batch_size]
+            results[f'{prefix}.batch.preprocess'] = measure(lambda: population['encoder'].encode_batch(batch), repeat)
+            matrix = population['encoder'].encode_batch(batch)[0]
+            if population['model'] is not None:
+                results[f'{prefix}.batch.predict_proba'] = measure(lambda: population['model'].predict_proba(matrix), repeat)
+            results[f'{prefix}.batch.predict_engine'] = measure(lambda: population['predictor'].predict_proba(matrix), repeat)
+            results[f'{prefix}.batch.explain'] = measure(lambda: app.explain_records(population, matrix, batch), repeat)
+            results[f'{prefix}.batch.end_to_end'] = measure(
+                lambda: client.post(f'/predict/{user_type}/batch', json=batch), repeat)
+    return results
+
+
+def clone_dataset(df, factor, seed=0):
+    """Returns `factor` times as many rows, resampled with replacement from df."""
+    if factor == 1:
+        return df
+    return df.sample(n=int(len(df) * factor), replace=True, random_state=seed).reset_index(drop=True)
+
+
+def bench_training(sizes, repeat, n_iter):
+    """Times each train_models.py stage on the dataset cloned up to each size factor."""
+    import joblib
+    import pandas as pd
+    import train_models
+    from dataset_loader import load_populations, open_dataset
+
+    served = joblib.load(os.path.join(base_dir, 'models', 'best_model_students.pkl')).get_params()
+    served_params = {k: served[k] for k in train_models.param_grid}
+    source = pd.read_csv(DATASET_PATH)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in sizes:
+            df = clone_dataset(source, factor)
+            prefix = f'training.x{factor:g}'
+            csv_path = os.path.join(tmp, f'dataset_x{factor:g}.csv')
+            df.to_csv(csv_path, index=False)
+
+            results[f'{prefix}.read_csv'] = measure(lambda: pd.read_csv(csv_path), repeat, warmup=0)
+            results[f'{prefix}.encode_dataset'] = measure(lambda: train_models.encode_dataset(df), repeat, warmup=0)
+            results[f'{prefix}.load_encode_streaming'] = measure(
+                lambda: train_models.encode_populations(*load_populations(open_dataset(csv_path))), repeat, warmup=0)
+            encoded = train_models.encode_dataset(df)
+            X_train, _, y_train, _, _ = encoded['student']
+            results[f'{prefix}.fit_served_params'] = measure(
+                lambda: train_models.RandomForestClassifier(class_weight='balanced', random_state=42, **served_params).fit(X_train, y_train),
+                repeat, warmup=0)
+            results[f'{prefix}.encode_dataset_sparse'] = measure(lambda: train_models.encode_dataset(df, sparse=True), repeat, warmup=0)
+            X_train_sparse, _, y_train_sparse, _, _ = train_models.encode_dataset(df, sparse=True)['student']
+            results[f'{prefix}.fit_served_params_sparse'] = measure(
+                lambda: train_models.RandomForestClassifier(class_weight='balanced', random_state=42, **served_params).fit(X_train_sparse, y_train_sparse),
+                repeat, warmup=0)
+            results[f'{prefix}.random_search'] = measure(
+                lambda: train_models.run_searches(encoded, strategy='random', n_iter=n_iter), repeat, warmup=0)
+            for stage in (f'{prefix}.read_csv', f'{prefix}.encode_dataset', f'{prefix}.load_encode_streaming',
+                          f'{prefix}.fit_served_params', f'{prefix}.encode_dataset_sparse', f'{prefix}.fit_served_params_sparse',
+                          f'{prefix}.random_search'):
+                results[stage]['rows'] = int(len(df))
+    return results
+
+
+def environment_info():
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=base_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor_ms=NOISE_FLOOR_MS):
+    """Compares median timings against a baseline results file's; returns the regressions found."""
+    regressions = []
+    for name, stats in sorted(results.items()):
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        ratio = stats['median_ms'] / before['median_ms'] if before['median_ms'] > 0 else float('inf')
+        slower_by = stats['median_ms'] - before['median_ms']
+        flag = ''
+        if ratio > 1 + tolerance and slower_by > noise_floor_ms:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<55} {before['median_ms']:>10.3f} -> {stats['median_ms']:>10.3f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the serving path and the training pipeline.")
+    parser.add_argument('--suite', choices=['serving', 'training', 'all'], default='all')
+    parser.add_argument('--repeat', type=int, default=50, help="Timed calls per serving benchmark")
+    parser.add_argument('--batch-size', type=int, default=256, help="Rows per batch benchmark (0 skips them)")
+    parser.add_argument('--train-repeat', type=int, default=1, help="Timed runs per training stage")
+    parser.add_argument('--sizes', default='1,2,4', help="Comma-separated dataset size factors for training benchmarks")
+    parser.add_argument('--n-iter', type=int, default=3, help="Candidates per population in the random search stage")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results JSON")
+    parser.add_argument('--baseline', help="Results JSON from an earlier commit to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed median slowdown before a benchmark counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.suite in ('serving', 'all'):
+        results.update(bench_serving(args.repeat, args.batch_size))
+    if args.suite in ('training', 'all'):
+        sizes = [float(s) for s in args.sizes.split(',') if s.strip()]
+        results.update(bench_training(sizes, args.train_repeat, args.n_iter))
+
+    report = {'format_version': RESULTS_FORMAT_VERSION, 'environment': environment_info(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for name, stats in sorted(results.items()):
+        print(f"{name:<55} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms")
+    print(f"Results written to '{args.output}'.")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        print(f"--- Compared with {args.baseline} (commit {baseline.get('environment', {}).get('commit')}) ---")
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}.")
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from dataset_loader import POPULATION_LABELS, USER_TYPE_COLUMN, open_dataset
+
+# Scoring uses app.py's models, encoders and explainers, so they must be loaded when
+# app is imported (and shared with forked workers); the prediction cache would only
+# hold rows that are never seen twice
+os.environ['MINDCARE_LAZY_LOAD'] = '0'
+os.environ['MINDCARE_CACHE_SIZE'] = '0'
+
+USER_TYPES = {label: user_type for user_type, label in POPULATION_LABELS.items()}
+
+DEFAULT_CHUNK_SIZE = 10000
+CONTRIBUTIONS_COLUMN = 'feature_contributions'
+
+
+def input_features(user_type):
+    """The input columns the population's model reads, as app.py's forms submit them."""
+    from feature_encoder import BINARY_MAPS
+    import app
+
+    if user_type == 'student':
+        numerical_cols, categorical_cols = app.student_numerical_cols, app.student_categorical_cols
+    else:
+        numerical_cols, categorical_cols = app.professional_numerical_cols, app.professional_categorical_cols
+    return list(BINARY_MAPS) + numerical_cols + categorical_cols
+
+
+def required_columns():
+    columns = {USER_TYPE_COLUMN}
+    for user_type in USER_TYPES.values():
+        columns.update(input_features(user_type))
+    return columns
+
+
+def file_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def score_chunk(start_row, chunk, explain=False):
+    """Scores one chunk of input rows and returns a DataFrame with one output row per input row.
+
+    Rows are routed by USER_TYPE_COLUMN, encoded with the population's FeatureEncoder
+    and scored with its predictor, exactly as POST /predict/<user_type>/batch does.
+    """
+    import app
+
+    n_rows = len(chunk)
+    user_types = chunk[USER_TYPE_COLUMN].astype('object').map(USER_TYPES)
+    out = {
+        'row': np.arange(start_row, start_row + n_rows, dtype=np.int64),
+        'user_type': user_types.where(user_types.notna(), None).tolist(),
+        'risk_score': np.full(n_rows, np.nan),
+        'risk_category': [None] * n_rows,
+        'error': [None] * n_rows,
+    }
+    if explain:
+        out[CONTRIBUTIONS_COLUMN] = [None] * n_rows
+
+    for pos in np.flatnonzero(user_types.isna().to_numpy()):
+        out['error'][pos] = f"Unknown '{USER_TYPE_COLUMN}' value: {chunk[USER_TYPE_COLUMN].iloc[pos]!r}"
+
+    for user_type in USER_TYPES.values():
+        positions = np.flatnonzero((user_types == user_type).to_numpy())
+        if len(positions) == 0:
+            continue
+        population = app.get_population(user_type)
+        records = chunk[input_features(user_type)].iloc[positions].to_dict('records')
+
+        processed, encoded, errors = population['encoder'].encode_batch(records)
+        for pos, message in errors.items():
+            out['error'][positions[pos]] = message
+        # Same rule as score_records: a NaN anywhere (missing number, unknown Yes/No) is unscorable
+        invalid = np.isnan(processed).any(axis=1)
+        for row_num in np.flatnonzero(invalid):
+            bad_cols = [population['columns'][i] for i in np.flatnonzero(np.isnan(processed[row_num]))]
+            out['error'][positions[encoded[row_num]]] = f'Error during data preprocessing: invalid or missing values for {", ".join(bad_cols)}'
+        processed = processed[~invalid]
+        encoded = [pos for pos, bad in zip(encoded, invalid) if not bad]
+        if not encoded:
+            continue
+
+        risk_scores = population['predictor'].predict_proba(processed)[:, 1] * 10
+        for row_num, pos in enumerate(encoded):
+            risk_score = round(float(risk_scores[row_num]), 2)
+            out['risk_score'][positions[pos]] = risk_score
+            out['risk_category'][positions[pos]] = app.get_risk_category(risk_score, population['risk_category_cutoffs'])[0]
+        if explain:
+            contributions = app.explain_records(population, processed, [records[pos] for pos in encoded])
+            for pos, c in zip(encoded, contributions):
+                out[CONTRIBUTIONS_COLUMN][positions[pos]] = json.dumps(c, separators=(',', ':'))
+    return pd.DataFrame(out)
+
+
+class ResultWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path, fmt, explain):
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self.errors = 0
+        if fmt == 'csv':
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Writing Parquet needs pyarrow (pip install pyarrow).")
+        fields = [('row', pa.int64()), ('user_type', pa.string()), ('risk_score', pa.float64()),
+                  ('risk_category', pa.string()), ('error', pa.string())]
+        if explain:
+            fields.append((CONTRIBUTIONS_COLUMN, pa.string()))
+        self._schema = pa.schema(fields)
+        self._table = pa.Table
+        self._file = pq.ParquetWriter(path, self._schema)
+
+    def write(self, frame):
+        if self.fmt == 'csv':
+            frame.to_csv(self._file, header=self.rows == 0, index=False)
+        else:
+            self._file.write_table(self._table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        self.rows += len(frame)
+        self.errors += int(frame['error'].notna().sum())
+
+    def close(self):
+        self._file.close()
+
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, explain=False,
+               input_format=None, output_format=None, table=None):
+    """Scores every row of input_path into output_path; returns (rows, error rows).
+
+    At most 2 * workers chunks are read ahead of the writer, so memory use depends on
+    chunk_size and workers, not on the size of the file. Output rows keep the input
+    order, and `row` is the 0-based position of the row in the input.
+    """
+    import app  # Loads the models before any worker is forked, so workers share them
+
+    source = open_dataset(input_path, table=table, fmt=input_format)
+    chunks = source.iter_chunks(columns=sorted(required_columns()), chunk_size=chunk_size)
+    writer = ResultWriter(output_path, file_format(output_path, output_format), explain)
+    start_row = 0
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                writer.write(score_chunk(start_row, chunk, explain))
+                start_row += len(chunk)
+        else:
+            import multiprocessing
+
+            pending = deque()
+            with multiprocessing.Pool(workers) as pool:
+                for chunk in chunks:
+                    pending.append(pool.apply_async(score_chunk, (start_row, chunk, explain)))
+                    start_row += len(chunk)
+                    if len(pending) >= 2 * workers:
+                        writer.write(pending.popleft().get())
+                while pending:
+                    writer.write(pending.popleft().get())
+    finally:
+        writer.close()
+    return writer.rows, writer.errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a survey export (same columns as final_depression_dataset_1.csv) "
+                                                 "with the models app.py serves.")
+    parser.add_argument('input', help="CSV, Parquet or SQLite (with --table) file to score")
+    parser.add_argument('output', help="Where to write the scores (.csv, or .parquet/.pq)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read and scored at a time")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Scoring processes (1 scores in this process)")
+    parser.add_argument('--explain', action='store_true', help="Add each row's SHAP breakdown as a JSON column")
+    parser.add_argument('--input-format', choices=['csv', 'parquet', 'sqlite'], help="Override the format implied by the input's extension")
+    parser.add_argument('--table', help="Table to read when the input is a SQLite database")
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], help="Override the format implied by the output's extension")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        rows, errors = score_file(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                                  explain=args.explain, input_format=args.input_format,
+                                  output_format=args.output_format, table=args.table)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows} rows ({errors} with errors) in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s); "
+          f"results written to '{args.output}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
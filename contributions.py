@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class ContributionIndex:
+    """Maps form answers to the model columns their SHAP contributions are read from.
+
+    Built once per model from its column list. A numerical or binary answer reads the
+    column named after the feature; any other answer reads the one-hot column
+    "<feature>_<value>", found with two dict lookups on (feature, value) instead of
+    scanning the column names. Answers with no such column (unknown values, fields
+    the model does not use) and excluded features contribute nothing.
+    """
+
+    def __init__(self, columns, excluded_features=()):
+        self.column_index = {col: i for i, col in enumerate(columns)}
+        # feature -> {value: column index}, for every way a column name splits at an underscore
+        self.one_hot_index = {}
+        for col, i in self.column_index.items():
+            split = col.find('_')
+            while split != -1:
+                self.one_hot_index.setdefault(col[:split], {})[col[split + 1:]] = i
+                split = col.find('_', split + 1)
+        self.excluded_features = frozenset(excluded_features)
+
+    def lookup(self, record):
+        """Returns (features, column indices) for the answers in `record` that have a contribution, in record order."""
+        column_index = self.column_index
+        one_hot_index = self.one_hot_index
+        features, indices = [], []
+        for feature, value in record.items():
+            if feature in self.excluded_features:
+                continue
+            i = column_index.get(feature)
+            if i is None:
+                values = one_hot_index.get(feature)
+                if values is None:
+                    continue
+                i = values.get(f"{value}")
+                if i is None:
+                    continue
+            features.append(feature)
+            indices.append(i)
+        return features, indices
+
+    def percentages(self, shap_values, lookups):
+        """Returns each record's contributions as signed percentages of its total absolute SHAP value.
+
+        `shap_values` is the (n_rows, n_columns) SHAP matrix of the records and
+        `lookups` their lookup() results. The selected values of the whole batch are
+        gathered into one padded matrix and scaled together. Totals are accumulated
+        left to right in record order, so every percentage is the same float the
+        per-record sum over a dict produced. A record whose total is zero gets 0 for
+        every feature.
+        """
+        n_rows = len(lookups)
+        width = max((len(indices) for _, indices in lookups), default=0)
+        if width == 0:
+            return [{} for _ in range(n_rows)]
+        index = np.zeros((n_rows, width), dtype=np.intp)
+        present = np.zeros((n_rows, width), dtype=bool)
+        for row, (_, indices) in enumerate(lookups):
+            index[row, :len(indices)] = indices
+            present[row, :len(indices)] = True
+
+        values = np.take_along_axis(np.asarray(shap_values, dtype=np.float64), index, axis=1)
+        values[~present] = 0.0
+        totals = np.cumsum(np.abs(values), axis=1)[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled = values / totals[:, None] * 100
+
+        results = []
+        for row, (features, _) in enumerate(lookups):
+            if totals[row] > 0:
+                results.append(dict(zip(features, scaled[row, :len(features)].tolist())))
+            else:
+                results.append(dict.fromkeys(features, 0))
+        return results
@@ -0,0 +1,208 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+
+import pandas as pd
+
+USER_TYPE_COLUMN = 'Working Professional or Student'
+POPULATION_LABELS = {'student': 'Student', 'professional': 'Working Professional'}
+
+# Columns of final_depression_dataset_1.csv, in file order. Every source is read into
+# this order, so the encoded column order does not depend on the file format.
+DATASET_COLUMNS = [
+    'Name', 'Gender', 'Age', 'City', USER_TYPE_COLUMN, 'Profession', 'Academic Pressure', 'Work Pressure',
+    'CGPA', 'Study Satisfaction', 'Job Satisfaction', 'Sleep Duration', 'Dietary Habits', 'Degree',
+    'Have you ever had suicidal thoughts ?', 'Work/Study Hours', 'Financial Stress',
+    'Family History of Mental Illness', 'Depression',
+]
+
+# Column types, fixed instead of inferred per chunk. The one-hot column names are built
+# from the values ("Academic Pressure_3.0", "Financial Stress_3"), so a chunk in which
+# Academic Pressure happened to parse as int would name its columns differently.
+# Text answers are categoricals: one small integer code per row instead of a string.
+DATASET_DTYPES = {
+    'Name': 'object',
+    'Gender': 'category',
+    'Age': 'float64',
+    'City': 'category',
+    USER_TYPE_COLUMN: 'category',
+    'Profession': 'category',
+    'Academic Pressure': 'float64',
+    'Work Pressure': 'float64',
+    'CGPA': 'float64',
+    'Study Satisfaction': 'float64',
+    'Job Satisfaction': 'float64',
+    'Sleep Duration': 'category',
+    'Dietary Habits': 'category',
+    'Degree': 'category',
+    'Have you ever had suicidal thoughts ?': 'category',
+    'Work/Study Hours': 'float64',
+    'Financial Stress': 'Int64',
+    'Family History of Mental Illness': 'category',
+    'Depression': 'category',
+}
+
+# Columns that do not apply to each population and are dropped before its dropna
+DROPPED_COLUMNS = {
+    'student': ["Work Pressure", "Profession", "Job Satisfaction"],
+    'professional': ["Academic Pressure", "CGPA", "Study Satisfaction"],
+}
+
+# What build_vocabulary reads; only their distinct combinations are kept while streaming
+VOCABULARY_COLUMNS = ['City', USER_TYPE_COLUMN, 'Degree', 'Profession']
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def _select(chunk, columns, path):
+    """Returns chunk's `columns` (default: all) in DATASET_COLUMNS order, with DATASET_DTYPES applied."""
+    if columns is not None:
+        missing = [col for col in columns if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"{path} is missing column(s): {', '.join(missing)}")
+    order = [col for col in DATASET_COLUMNS if col in chunk.columns] + [col for col in chunk.columns if col not in DATASET_COLUMNS]
+    chunk = chunk[[col for col in order if columns is None or col in columns]]
+    dtypes = {col: dtype for col, dtype in DATASET_DTYPES.items() if col in chunk.columns and chunk[col].dtype != dtype}
+    return chunk.astype(dtypes) if dtypes else chunk
+
+
+def _file_hash(path, extra=''):
+    digest = hashlib.sha256(extra.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CSVSource:
+    """A CSV file with the dataset's columns."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self):
+        return _file_hash(self.path)
+
+    def iter_chunks(self, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields DataFrames of at most chunk_size rows, indexed by row number in the file."""
+        wanted = None if columns is None else set(columns)
+        reader = pd.read_csv(self.path, chunksize=chunk_size, dtype=DATASET_DTYPES,
+                             usecols=None if wanted is None else (lambda col: col in wanted))
+        for chunk in reader:
+            yield _select(chunk, columns, self.path)
+
+
+class ParquetSource:
+    """A Parquet file with the dataset's columns; needs pyarrow."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self):
+        return _file_hash(self.path)
+
+    def iter_chunks(self, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet needs pyarrow (pip install pyarrow).")
+        parquet = pq.ParquetFile(self.path)
+        names = [col for col in parquet.schema_arrow.names if columns is None or col in columns]
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=names):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield _select(chunk, columns, self.path)
+
+
+class SQLiteSource:
+    """A table in a local SQLite database whose columns are named like the dataset's."""
+
+    def __init__(self, path, table):
+        self.path = path
+        self.table = table
+
+    def fingerprint(self):
+        return _file_hash(self.path, extra=f'table={self.table}')
+
+    @staticmethod
+    def _quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def iter_chunks(self, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        with contextlib.closing(sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)) as conn:
+            names = [row[1] for row in conn.execute(f'PRAGMA table_info({self._quote(self.table)})')]
+            if not names:
+                raise ValueError(f"{self.path} has no table named {self.table!r}")
+            selected = [col for col in names if columns is None or col in columns]
+            query = f'SELECT {", ".join(self._quote(col) for col in selected)} FROM {self._quote(self.table)}'
+            offset = 0
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield _select(chunk, columns, self.path)
+
+
+def open_dataset(path, table=None, fmt=None):
+    """Returns the source for `path`: CSV, Parquet (.parquet/.pq) or SQLite (.db/.sqlite/.sqlite3, needs `table`)."""
+    if fmt is None:
+        extension = os.path.splitext(path.lower())[1]
+        fmt = {'.parquet': 'parquet', '.pq': 'parquet', '.db': 'sqlite', '.sqlite': 'sqlite', '.sqlite3': 'sqlite'}.get(extension, 'csv')
+    if fmt == 'parquet':
+        return ParquetSource(path)
+    if fmt == 'sqlite':
+        if not table:
+            raise ValueError(f"Reading {path} needs the name of the table to read")
+        return SQLiteSource(path, table)
+    return CSVSource(path)
+
+
+def split_populations(df):
+    """Splits survey rows into student and professional frames, each cleaned as training expects.
+
+    Drops the columns that do not apply to the population, then every row with a
+    missing value (Name included), then the Name and user type columns, which the
+    models never see.
+    """
+    populations = {}
+    for population, label in POPULATION_LABELS.items():
+        frame = df[df[USER_TYPE_COLUMN] == label].drop(columns=DROPPED_COLUMNS[population]).dropna()
+        populations[population] = frame.drop(columns=['Name', USER_TYPE_COLUMN])
+    return populations
+
+
+def _concat(frames):
+    """Concatenates chunk frames, keeping categoricals as categoricals over the union of their values."""
+    if not frames:
+        return None
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categories = sorted(set().union(*(frame[col].cat.categories for frame in frames)))
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames)
+
+
+def load_populations(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Reads a source in one streaming pass.
+
+    Returns ({'student': frame, 'professional': frame}, vocabulary_frame). The
+    population frames are what split_populations returns for the whole dataset, with
+    the original row numbers as their index. vocabulary_frame holds the distinct
+    VOCABULARY_COLUMNS combinations of every row, which is all build_vocabulary needs.
+    Only one raw chunk is held at a time; what is kept is the cleaned rows, with text
+    answers stored as categorical codes.
+    """
+    parts = {population: [] for population in POPULATION_LABELS}
+    vocabulary_parts = []
+    for chunk in source.iter_chunks(columns=DATASET_COLUMNS, chunk_size=chunk_size):
+        vocabulary_parts.append(chunk[VOCABULARY_COLUMNS].astype('object').drop_duplicates())
+        for population, frame in split_populations(chunk).items():
+            parts[population].append(frame)
+    populations = {population: _concat(frames) for population, frames in parts.items()}
+    if any(frame is None for frame in populations.values()):
+        raise ValueError(f"{source.path} has no rows")
+    vocabulary_frame = pd.concat(vocabulary_parts, ignore_index=True).drop_duplicates()
+    return populations, vocabulary_frame
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class ExplanationJobs:
+    """Runs deferred SHAP explanations on a bounded thread pool and keeps their results for polling.
+
+    The pool is created on first use, so a gunicorn master that imports the app never
+    starts threads that forked workers would inherit in a broken state. Jobs live in
+    this process only: a client has to poll the same worker that scored it. Finished
+    jobs are dropped `ttl` seconds after they complete.
+    """
+
+    def __init__(self, max_workers=None, max_pending=256, ttl=600):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = None
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='explain')
+        return self._executor
+
+    def _expire(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and now - job['finished_at'] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _on_done(self, job_id, future):
+        with self._lock:
+            self._pending -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['finished_at'] = time.monotonic()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) and returns a job id, or None if the queue is full."""
+        with self._lock:
+            self._expire(time.monotonic())
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+            job_id = uuid.uuid4().hex
+            future = self._get_executor().submit(fn, *args, **kwargs)
+            self._jobs[job_id] = {'future': future, 'finished_at': None}
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def on_done(self, job_id, fn):
+        """Calls fn(status, value) when the job finishes, as result() would report it.
+
+        fn runs on the pool thread that finished the job, or right away if it already
+        has. Returns False, without calling fn, for unknown or expired jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return False
+
+        def done(future):
+            try:
+                value = future.result()
+            except Exception as e:
+                fn('error', str(e))
+            else:
+                fn('done', value)
+        job['future'].add_done_callback(done)
+        return True
+
+    def result(self, job_id, wait=0):
+        """Returns (status, value) for a job, waiting up to `wait` seconds for it to finish.
+
+        status is 'done' (value is the job's return value), 'pending', 'error' (value
+        is the error message) or 'unknown' for ids that never existed or have expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return 'unknown', None
+        try:
+            return 'done', job['future'].result(timeout=max(0, wait))
+        except FutureTimeoutError:
+            return 'pending', None
+        except Exception as e:
+            return 'error', str(e)
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'stored': len(self._jobs), 'max_workers': self.max_workers, 'max_pending': self.max_pending}
@@ -0,0 +1,92 @@
+import math
+import numpy as np
+
+# Binary inputs and the values they map to, matching preprocess_*_data in app.py
+BINARY_MAPS = {
+    "Have you ever had suicidal thoughts ?": {"Yes": 1, "No": 0},
+    "Family History of Mental Illness": {"Yes": 1, "No": 0},
+    "Gender": {"Male": 1, "Female": 0},
+}
+
+# Age is clipped to this range before scaling, as in training
+AGE_CLIP = (15, 65)
+
+
+class FeatureEncoder:
+    """Turns request dicts into model-ready NumPy rows without going through pandas.
+
+    Built once from a model's column list and its fitted StandardScaler. The output is
+    bit-identical to preprocess_student_data / preprocess_professional_data: binary
+    answers are mapped, each categorical answer sets the one-hot column named
+    "<feature>_<value>" (unknown values leave the row all-zero, like pd.get_dummies
+    followed by column alignment), Age is clipped and the numerical columns are scaled
+    with the same (x - mean) / scale arithmetic StandardScaler.transform uses.
+    """
+
+    def __init__(self, columns, scaler, numerical_cols, categorical_cols, binary_maps=BINARY_MAPS):
+        self.columns = list(columns)
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.categorical_cols = frozenset(categorical_cols)
+        self.binary_maps = {col: mapping for col, mapping in binary_maps.items() if col in self.column_index}
+        self.numerical_idx = np.array([self.column_index[col] for col in numerical_cols], dtype=np.intp)
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64).copy()
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64).copy()
+        self.age_idx = self.column_index.get('Age')
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def _fill_row(self, row, record):
+        column_index = self.column_index
+        for feature, value in record.items():
+            if feature == 'Name':
+                continue
+            if feature in self.binary_maps:
+                mapped = self.binary_maps[feature].get(value) if isinstance(value, str) else None
+                row[column_index[feature]] = np.nan if mapped is None else mapped
+            elif feature in self.categorical_cols:
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                idx = column_index.get(f"{feature}_{value}")
+                if idx is not None:
+                    row[idx] = 1.0
+            elif feature in column_index:
+                row[column_index[feature]] = np.nan if value is None else float(value)
+
+    def _finish(self, matrix):
+        if self.age_idx is not None:
+            ages = matrix[:, self.age_idx]
+            matrix[:, self.age_idx] = np.clip(ages, AGE_CLIP[0], AGE_CLIP[1])
+        numerical = matrix[:, self.numerical_idx]
+        numerical -= self.mean
+        numerical /= self.scale
+        matrix[:, self.numerical_idx] = numerical
+        return matrix
+
+    def encode(self, record):
+        """Encodes a single request dict into a (1, n_features) float64 array."""
+        matrix = np.zeros((1, self.n_features), dtype=np.float64)
+        self._fill_row(matrix[0], record)
+        return self._finish(matrix)
+
+    def encode_batch(self, records):
+        """Encodes many request dicts into one preallocated matrix.
+
+        Returns the matrix for the records that could be encoded, the positions of
+        those records in the input, and a dict of position -> error message for the
+        ones that could not (e.g. a non-numeric Age).
+        """
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float64)
+        positions = []
+        errors = {}
+        for pos, record in enumerate(records):
+            row = matrix[len(positions)]
+            try:
+                self._fill_row(row, record)
+            except (TypeError, ValueError) as e:
+                row[:] = 0.0
+                errors[pos] = f'Error during data preprocessing: {str(e)}'
+                continue
+            positions.append(pos)
+        return self._finish(matrix[:len(positions)]), positions, errors
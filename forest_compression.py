@@ -0,0 +1,253 @@
+"""Compression of fitted RandomForestClassifiers for train_models.py --compress.
+
+This works on scikit-learn internals: trees are rebuilt through
+sklearn.tree._tree.Tree.__setstate__ from a raw node array, and the out-of-bag rows
+come from sklearn.ensemble._forest's private helpers. It is written against the
+pinned scikit-learn==1.2.1. compression_candidates checks that a forest rebuilt
+without pruning still predicts exactly as the original, so a version whose internals
+have moved fails there instead of shipping a broken model.
+"""
+import copy
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+from sklearn.metrics import roc_auc_score
+from sklearn.tree._tree import TREE_LEAF, TREE_UNDEFINED, Tree
+
+from model_bundle import load_bundle
+
+# Shares of the forest's trees kept by the candidate subsets
+TREE_FRACTIONS = (1.0, 0.75, 0.5, 0.3, 0.2, 0.1)
+# Depth caps tried (those below the forest's own depth)
+DEPTH_CAPS = (8, 6, 4)
+# Minimum contribution a split must make to survive pruning; 0 only merges redundant leaves
+MIN_CONTRIBUTIONS = (0.0, 1e-3)
+
+
+def _distributions(values):
+    counts = values[:, 0, :]
+    normalizer = counts.sum(axis=1)[:, None]
+    normalizer[normalizer == 0.0] = 1.0
+    return counts / normalizer
+
+
+def compress_tree(tree, max_depth=None, min_contribution=0.0):
+    """Returns a smaller copy of a fitted sklearn Tree.
+
+    Working up from the leaves, a split becomes a leaf (keeping the class counts it
+    already stores) when:
+      - it sits at max_depth or deeper;
+      - both of its children are leaves with the same class distribution, which
+        changes no prediction; the leaf takes one child's counts, as its own sum
+        can normalise to a distribution an ulp away; or
+      - its contribution, the share of the root's weighted samples times how far
+        its children's distributions move away from its own, is below
+        min_contribution.
+    The remaining nodes are renumbered depth-first, as sklearn numbers them.
+    """
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values'].copy()
+    left, right = nodes['left_child'].copy(), nodes['right_child'].copy()
+    weights = nodes['weighted_n_node_samples']
+    distributions = _distributions(values)
+
+    depth = np.zeros(len(nodes), dtype=np.intp)
+    for node in range(len(nodes)):
+        if left[node] != TREE_LEAF:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+
+    # Children are numbered after their parent, so this visits them first
+    for node in range(len(nodes) - 1, -1, -1):
+        l, r = left[node], right[node]
+        if l == TREE_LEAF:
+            continue
+        collapse = max_depth is not None and depth[node] >= max_depth
+        if not collapse and left[l] == TREE_LEAF and left[r] == TREE_LEAF:
+            if np.array_equal(distributions[l], distributions[r]):
+                values[node] = values[l]
+                distributions[node] = distributions[l]
+                collapse = True
+            elif min_contribution > 0:
+                shift = (weights[l] * np.abs(distributions[l] - distributions[node]).sum()
+                         + weights[r] * np.abs(distributions[r] - distributions[node]).sum())
+                collapse = shift / (2 * weights[0]) < min_contribution
+        if collapse:
+            left[node] = right[node] = TREE_LEAF
+
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if left[node] != TREE_LEAF:
+            stack += [right[node], left[node]]
+    order = np.array(order, dtype=np.intp)
+    new_id = np.full(len(nodes), TREE_LEAF, dtype=np.intp)
+    new_id[order] = np.arange(len(order))
+
+    kept = nodes[order].copy()
+    is_leaf = left[order] == TREE_LEAF
+    kept['left_child'] = np.where(is_leaf, TREE_LEAF, new_id[left[order]])
+    kept['right_child'] = np.where(is_leaf, TREE_LEAF, new_id[right[order]])
+    kept['feature'] = np.where(is_leaf, TREE_UNDEFINED, kept['feature'])
+    kept['threshold'] = np.where(is_leaf, TREE_UNDEFINED, kept['threshold'])
+
+    compressed = Tree(tree.n_features, np.array(tree.n_classes, dtype=np.intp), tree.n_outputs)
+    compressed.__setstate__({
+        'max_depth': int(depth[order][is_leaf].max()),
+        'node_count': len(order),
+        'nodes': kept,
+        'values': np.ascontiguousarray(values[order]),
+    })
+    return compressed
+
+
+def _with_estimators(model, estimators):
+    forest = copy.copy(model)
+    forest.estimators_ = estimators
+    forest.n_estimators = len(estimators)
+    return forest
+
+
+def compress_forest(model, max_depth=None, min_contribution=0.0):
+    """Returns a copy of a fitted RandomForestClassifier with every tree compressed (see compress_tree).
+
+    The copy is an ordinary fitted forest, so PackedForest, ForestExplainer,
+    write_bundle and pickling all handle it like any other.
+    """
+    estimators = []
+    for estimator in model.estimators_:
+        compressed = copy.copy(estimator)
+        compressed.tree_ = compress_tree(estimator.tree_, max_depth, min_contribution)
+        estimators.append(compressed)
+    return _with_estimators(model, estimators)
+
+
+def verify_lossless(model, compressed, X):
+    """Raises RuntimeError unless `compressed` gives exactly model.predict_proba on every row of X."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        expected, actual = model.predict_proba(X), compressed.predict_proba(X)
+    if actual.shape != expected.shape:
+        raise RuntimeError(f"Rebuilt trees give probabilities of shape {actual.shape}, the originals {expected.shape}")
+    mismatched = int(np.count_nonzero(actual != expected))
+    if mismatched:
+        raise RuntimeError(f"Rebuilt trees differ from the originals in {mismatched} probabilities "
+                           f"(by up to {np.abs(actual - expected).max():.3g})")
+
+
+def subset_forest(model, trees):
+    """Returns a copy of a fitted RandomForestClassifier keeping only the trees at the given indices."""
+    return _with_estimators(model, [model.estimators_[t] for t in trees])
+
+
+def oob_tree_order(model, X_train, y_train):
+    """Orders the trees by greedy forward selection on out-of-bag ROC AUC.
+
+    Each step adds the tree that most improves the AUC of the selected trees'
+    averaged out-of-bag probabilities, so any prefix of the order is a good subset
+    of that size; the training rows a tree was fitted on never score it. Forests
+    fitted without bootstrap have no out-of-bag rows and keep their own order.
+    """
+    n_trees = len(model.estimators_)
+    if not model.bootstrap:
+        return list(range(n_trees))
+    X = np.asarray(X_train.toarray() if hasattr(X_train, 'toarray') else X_train, dtype=np.float32)
+    n_samples = len(X)
+    n_bootstrap = _get_n_samples_bootstrap(n_samples, model.max_samples)
+    sums = np.zeros((n_trees, n_samples))
+    counts = np.zeros((n_trees, n_samples))
+    for t, estimator in enumerate(model.estimators_):
+        rows = _generate_unsampled_indices(estimator.random_state, n_samples, n_bootstrap)
+        sums[t, rows] = estimator.predict_proba(X[rows])[:, 1]
+        counts[t, rows] = 1
+
+    order, remaining = [], list(range(n_trees))
+    selected_sum, selected_count = np.zeros(n_samples), np.zeros(n_samples)
+    while remaining:
+        best, best_auc = remaining[0], -1.0
+        for t in remaining:
+            count = selected_count + counts[t]
+            covered = count > 0
+            if len(np.unique(y_train[covered])) < 2:
+                continue
+            auc = roc_auc_score(y_train[covered], (selected_sum + sums[t])[covered] / count[covered])
+            if auc > best_auc:
+                best, best_auc = t, auc
+        order.append(best)
+        remaining.remove(best)
+        selected_sum += sums[best]
+        selected_count += counts[best]
+    return order
+
+
+def _median_ms(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def compression_candidates(model, X_train, y_train, X_test, y_test, write_bundle, repeat=50):
+    """Builds and measures every candidate compression of a fitted forest.
+
+    Candidates cover each combination of TREE_FRACTIONS (prefixes of oob_tree_order),
+    DEPTH_CAPS and MIN_CONTRIBUTIONS; the first is the forest with only its redundant
+    leaves merged, which predicts exactly as the original does (verify_lossless
+    raises otherwise). `write_bundle(path, model)` writes a model's bundle: its file
+    size is reported, and the serving and SHAP latencies are those of the forest and
+    explainer loaded back from it, scoring a single test row. Returns
+    [(report entry, model)], in candidate order.
+    """
+    rows = np.asarray(X_test[:1].toarray() if hasattr(X_test, 'toarray') else X_test[:1], dtype=np.float64)
+    depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+    n_trees = len(model.estimators_)
+    sizes = sorted({max(1, round(n_trees * fraction)) for fraction in TREE_FRACTIONS}, reverse=True)
+
+    candidates = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for max_depth in (None,) + tuple(d for d in DEPTH_CAPS if d < depth):
+            for min_contribution in MIN_CONTRIBUTIONS:
+                trimmed = compress_forest(model, max_depth=max_depth, min_contribution=min_contribution)
+                if max_depth is None and min_contribution == 0.0:
+                    # Only redundant leaves were merged, so nothing may have changed
+                    verify_lossless(model, trimmed, X_train)
+                    verify_lossless(model, trimmed, X_test)
+                order = oob_tree_order(trimmed, X_train, y_train)
+                for n in sizes:
+                    candidate = subset_forest(trimmed, order[:n])
+                    path = os.path.join(tmp, f'candidate{len(candidates)}.bundle')
+                    write_bundle(path, candidate)
+                    bundle = load_bundle(path)
+                    forest, explainer = bundle.forest(), bundle.explainer()
+                    with warnings.catch_warnings():
+                        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+                        test_auc = roc_auc_score(y_test, candidate.predict_proba(X_test)[:, 1])
+                    predict_ms = _median_ms(lambda forest=forest: forest.predict_proba(rows), repeat)
+                    shap_ms = _median_ms(lambda explainer=explainer: explainer.shap_values(rows), max(1, repeat // 5))
+                    entry = {
+                        'n_trees': n,
+                        'max_depth': max_depth,
+                        'min_contribution': min_contribution,
+                        'n_nodes': int(forest.n_nodes),
+                        'bundle_bytes': os.path.getsize(path),
+                        'test_auc': round(float(test_auc), 6),
+                        'predict_ms': round(predict_ms, 4),
+                        'shap_ms': round(shap_ms, 4),
+                    }
+                    del forest, explainer, bundle
+                    candidates.append((entry, candidate))
+    return candidates
+
+
+def select_candidate(entries, tolerance):
+    """Returns the index of the smallest bundle whose test AUC is within `tolerance` of the best one."""
+    best_auc = max(entry['test_auc'] for entry in entries)
+    eligible = [i for i, entry in enumerate(entries) if entry['test_auc'] >= best_auc - tolerance]
+    return min(eligible, key=lambda i: (entries[i]['bundle_bytes'], -entries[i]['test_auc']))
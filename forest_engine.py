@@ -0,0 +1,170 @@
+import os
+import sys
+import numpy as np
+
+# From this many rows on, sklearn's compiled traversal beats stepping the whole batch
+# through the packed arrays, so predict_proba hands the batch to the model itself
+SKLEARN_MIN_ROWS = 512
+
+
+class PackedForest:
+    """Evaluates a fitted RandomForestClassifier from packed NumPy node arrays.
+
+    Every tree's nodes are concatenated into flat feature/threshold/left/right arrays,
+    and each node stores its normalised class distribution. Leaves point to themselves
+    and compare against +inf, so a whole batch steps down every tree at once, one
+    level per iteration, without any per-node branching in Python.
+
+    predict_proba(X) returns the same array as the model's predict_proba: inputs go
+    through float32 as sklearn's do, and per-tree probabilities are summed in tree
+    order before dividing by the number of trees, exactly as sklearn accumulates
+    them. It skips sklearn's input validation and thread pool, which dominate the cost
+    of scoring a handful of rows; batches of SKLEARN_MIN_ROWS or more are passed to
+    the model, whose results are the same.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.n_trees = len(model.estimators_)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count) + offset
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            # DecisionTreeClassifier.predict_proba's normalisation, zero rows left as-is
+            counts = tree.value[:, 0, :]
+            normalizer = counts.sum(axis=1)[:, None]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(counts / normalizer)
+            depth = max(depth, tree.max_depth)
+            offset += tree.node_count
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.intp)
+        self.max_depth = depth
+        # children[2 * node + went_right] is the next node
+        self.children = np.ascontiguousarray(np.stack([self.left, self.right], axis=1).ravel())
+
+    # Arrays that fully describe the packed forest; see to_arrays / from_arrays
+    ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+    def to_arrays(self):
+        """Returns the node arrays plus the scalars needed to rebuild the forest with from_arrays."""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_NAMES}
+        meta = {'classes': self.classes_.tolist(), 'n_features': int(self.n_features_in_), 'max_depth': int(self.max_depth)}
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """Rebuilds a forest from to_arrays output without the sklearn model.
+
+        The arrays are used as given (e.g. read-only memory maps) and never copied.
+        Without the model every batch size goes through the packed traversal.
+        """
+        forest = cls.__new__(cls)
+        forest.model = None
+        forest.classes_ = np.array(meta['classes'])
+        forest.n_features_in_ = meta['n_features']
+        forest.max_depth = meta['max_depth']
+        for name in cls.ARRAY_NAMES:
+            setattr(forest, name, arrays[name])
+        forest.n_trees = len(forest.roots)
+        forest.left = forest.children[0::2]
+        forest.right = forest.children[1::2]
+        return forest
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Returns the global leaf index reached in every tree, as an (n_rows, n_trees) array."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = X.astype(np.float32).astype(np.float64)
+        X = X.ravel()
+        row_offset = (np.arange(len(X) // self.n_features_in_) * self.n_features_in_)[:, None]
+        node = np.broadcast_to(self.roots, (len(row_offset), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            went_right = X.take(row_offset + self.feature.take(node)) > self.threshold.take(node)
+            node = self.children.take(2 * node + went_right)
+        return node
+
+    def predict_proba(self, X):
+        """Returns class probabilities with the same values and shape as the model's predict_proba."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if self.model is not None and X.shape[0] >= SKLEARN_MIN_ROWS:
+            return self.model.predict_proba(X)
+        leaves = self.apply(X)
+        per_tree = self.value.take(leaves, axis=0)
+        proba = np.zeros((leaves.shape[0], len(self.classes_)), dtype=np.float64)
+        for t in range(self.n_trees):
+            proba += per_tree[:, t]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def verify_against_sklearn(model, n_rows=2000, seed=0):
+    """Compares PackedForest with model.predict_proba on rows sampled around the split thresholds.
+
+    Returns the number of rows compared; raises AssertionError unless every
+    probability is identical.
+    """
+    import warnings
+
+    rng = np.random.default_rng(seed)
+    forest = PackedForest(model)
+    X = np.zeros((n_rows, forest.n_features_in_))
+    internal = forest.feature[forest.left != np.arange(forest.n_nodes)]
+    for feature in np.unique(internal):
+        thresholds = forest.threshold[(forest.feature == feature) & np.isfinite(forest.threshold)]
+        # Exact thresholds plus points just either side of them, where rounding matters
+        X[:, feature] = rng.choice(thresholds, size=n_rows) + rng.choice([-1e-7, 0.0, 1e-7, -0.5, 0.5], size=n_rows)
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        expected = model.predict_proba(X)
+    # Compare the packed traversal itself, not the large-batch hand-off to the model
+    actual = np.vstack([forest.predict_proba(X[start:start + SKLEARN_MIN_ROWS - 1])
+                        for start in range(0, n_rows, SKLEARN_MIN_ROWS - 1)])
+    assert actual.shape == expected.shape, f"Shape {actual.shape} differs from predict_proba's {expected.shape}"
+    mismatched = int(np.count_nonzero(actual != expected))
+    assert mismatched == 0, f"PackedForest differs from predict_proba in {mismatched} values"
+    single = np.vstack([forest.predict_proba(row) for row in X[:50]])
+    assert np.array_equal(single, expected[:50]), "Single-row PackedForest results differ from predict_proba"
+    return n_rows
+
+
+if __name__ == '__main__':
+    import joblib
+
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+    failed = False
+    for name in ['best_model_students.pkl', 'best_model_professionals.pkl']:
+        model = joblib.load(os.path.join(models_dir, name))
+        try:
+            n_rows = verify_against_sklearn(model)
+            print(f"{name}: matches predict_proba exactly on {n_rows} rows")
+        except AssertionError as e:
+            print(f"{name}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
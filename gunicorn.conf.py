@@ -0,0 +1,32 @@
+import gc
+import os
+
+# Settings previously passed on the command line in gunicorn.sh
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = 200
+
+# Import app.py, and with it the models, explainers and dataset vocabulary, once in
+# the master. Forked workers then share those pages copy-on-write instead of each
+# paying the full load and holding its own copy.
+preload_app = os.environ.get('MINDCARE_LAZY_LOAD', '0') != '1'
+
+# MINDCARE_SERVING_MODE=threaded runs gthread workers: each process holds
+# MINDCARE_THREADS connections while app.py scores on a pool sized to the cores, so
+# slow clients and I/O no longer tie up a whole process and its share of the models.
+# Set the process count with WEB_CONCURRENCY (or -w) as before.
+if os.environ.get('MINDCARE_SERVING_MODE', 'sync') == 'threaded':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('MINDCARE_THREADS', 32))
+
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent generation so the cyclic GC in
+    # the workers never writes to (and thereby un-shares) the preloaded objects
+    gc.freeze()
+    # Stored results (/result/<id>) and explanation jobs (/explanations/<job_id>) live
+    # in the worker that made them unless MINDCARE_RESULT_DB names a SQLite file they
+    # can share; with several workers a request may land on one that never saw them
+    if server.cfg.workers > 1 and not os.environ.get('MINDCARE_RESULT_DB'):
+        server.log.warning("Running %d workers with in-memory result and explanation stores; "
+                           "set MINDCARE_RESULT_DB so every worker can serve /result and /explanations",
+                           server.cfg.workers)
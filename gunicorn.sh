@@ -1,2 +1,2 @@
 #!/bin/sh
-gunicorn --timeout 200 --bind 0.0.0.0:$PORT app:app
\ No newline at end of file
+gunicorn --config gunicorn.conf.py app:app
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class InferenceBusy(Exception):
+    """Raised when the inference pool is saturated or a call waited too long for it."""
+
+
+class InferencePool:
+    """Runs CPU-bound inference for request threads on a bounded thread pool.
+
+    In threaded serving one process holds many connections, so without a bound every
+    one of them could be running a forest or a SHAP computation at once. run() hands
+    the call to one of max_workers threads (sized to the cores) and waits for it; at
+    most max_pending calls may be queued or running, and beyond that run() raises
+    InferenceBusy at once instead of letting requests pile up. The forests and
+    explainers are read-only once loaded, so the pool threads share them. With
+    max_workers=0 calls run inline, which is what sync workers (one request per
+    process) want. The pool is created on first use, as ExplanationJobs' is.
+    """
+
+    def __init__(self, max_workers=0, max_pending=64, timeout=30):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.timeout = timeout
+        self.rejected = 0
+        self.timed_out = 0
+        self._in_flight = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='inference')
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def run(self, fn, *args, **kwargs):
+        """Returns fn(*args, **kwargs), computed on the pool; raises InferenceBusy if it cannot be."""
+        if self.max_workers <= 0:
+            return fn(*args, **kwargs)
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self.rejected += 1
+                raise InferenceBusy(f"{self._in_flight} inference calls are already queued or running")
+            self._in_flight += 1
+            try:
+                future = self._get_executor().submit(fn, *args, **kwargs)
+            except BaseException:
+                self._in_flight -= 1
+                raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The call keeps its slot until it finishes, so a backlog still counts against max_pending
+            with self._lock:
+                self.timed_out += 1
+            raise InferenceBusy(f"inference did not finish within {self.timeout:g}s")
+
+    def stats(self):
+        with self._lock:
+            return {'max_workers': self.max_workers, 'max_pending': self.max_pending, 'in_flight': self._in_flight,
+                    'rejected': self.rejected, 'timed_out': self.timed_out}
+
+
+def default_max_workers(serving_mode):
+    """Pool size for a serving mode: one thread per core for 'threaded', inline (0) otherwise."""
+    return (os.cpu_count() or 1) if serving_mode == 'threaded' else 0
@@ -0,0 +1,155 @@
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the request stages range
+# from tens of microseconds (encoding) to seconds (large SHAP batches)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in the Prometheus text exposition format.
+
+    Metrics are declared once with counter()/histogram() and then updated by name with a
+    dict of labels. Values live in this process only, so under gunicorn each worker
+    reports its own numbers; scrape the workers individually or aggregate on the
+    Prometheus side.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text, None)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(buckets))
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name, labels=None, amount=1):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None):
+        key = tuple(sorted((labels or {}).items()))
+        buckets = self._meta[name][2]
+        with self._lock:
+            series = self._histograms[name]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = {'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, name, labels=None):
+        """Observes the wall-clock duration of the with-block into histogram `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def render(self, snapshots=()):
+        """Returns every metric as exposition text.
+
+        `snapshots` is an iterable of (name, kind, help, value, labels) for values the
+        caller reads at scrape time from elsewhere (cache size and hit counts, queue
+        depth, load times); kind is 'gauge' or 'counter' and None values are skipped.
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self._meta.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                    continue
+                for key, state in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(buckets, state['counts']):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key + (("le", _format_value(bound)),))} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {state["count"]}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {_format_value(state["sum"])}')
+                    lines.append(f'{name}_count{_format_labels(key)} {state["count"]}')
+
+        described = set()
+        for name, kind, help_text, value, labels in snapshots:
+            if value is None:
+                continue
+            if name not in described:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+            lines.append(f'{name}{_format_labels(tuple(sorted((labels or {}).items())))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval from a background thread.
+
+    stop() returns the samples in the collapsed-stack format flamegraph.pl and
+    speedscope read: one "outer;...;inner count" line per distinct stack.
+    """
+
+    def __init__(self, thread_id=None, interval=0.001):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
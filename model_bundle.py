@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import numpy as np
+
+from forest_engine import PackedForest
+from tree_shap import ForestExplainer
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MAGIC = b'MCBUNDLE'
+# Every array starts on a 64-byte boundary so memory-mapped views are aligned
+ALIGNMENT = 64
+# Default thresholds; train_models.py records the ones each model was evaluated with
+DEFAULT_DECISION_THRESHOLD = 0.5
+DEFAULT_RISK_CATEGORY_CUTOFFS = (4, 7)
+
+
+def bundle_path(models_dir, population):
+    return os.path.join(models_dir, f'{population}.bundle')
+
+
+class ScalerParams:
+    """The part of a fitted StandardScaler the app needs: mean_, scale_ and transform()."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+
+def _content_hash(manifest, payload):
+    digest = hashlib.sha256(json.dumps(manifest, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+def write_bundle(path, population, model, scaler, columns, numerical_cols, categorical_cols, vocabulary,
+                 decision_threshold=DEFAULT_DECISION_THRESHOLD, risk_category_cutoffs=DEFAULT_RISK_CATEGORY_CUTOFFS):
+    """Writes everything needed to serve one population into a single bundle file.
+
+    Layout: the 8-byte magic, the manifest length as a little-endian uint64, the UTF-8
+    JSON manifest, then (from the next 64-byte boundary) the payload of raw
+    little-endian arrays, each padded to a 64-byte boundary. The manifest records
+    every array's dtype, shape and offset within the payload, plus a sha256 over the
+    manifest and the payload. The file is written next to `path` and renamed into
+    place, so readers never see half a bundle. Returns the content hash.
+    """
+    forest_arrays, forest_meta = PackedForest(model).to_arrays()
+    explainer_arrays, explainer_meta = ForestExplainer(model).to_arrays()
+    arrays = {f'forest/{name}': array for name, array in forest_arrays.items()}
+    arrays.update({f'explainer/{name}': array for name, array in explainer_arrays.items()})
+    arrays['scaler/mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+    arrays['scaler/scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    layout = {}
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder == '>' else array.dtype
+        data = array.astype(dtype, copy=False).tobytes()
+        layout[name] = {'dtype': dtype.str, 'shape': list(array.shape), 'offset': offset, 'nbytes': len(data)}
+        chunks.append(data)
+        chunks.append(b'\0' * _padding(len(data)))
+        offset += len(data) + _padding(len(data))
+    payload = b''.join(chunks)
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'population': population,
+        'columns': list(columns),
+        'numerical_cols': list(numerical_cols),
+        'categorical_cols': list(categorical_cols),
+        'vocabulary': vocabulary,
+        'thresholds': {'decision': float(decision_threshold), 'risk_category_cutoffs': list(risk_category_cutoffs)},
+        'forest': forest_meta,
+        'explainer': explainer_meta,
+        'arrays': layout,
+    }
+    manifest['content_hash'] = _content_hash(manifest, payload)
+
+    header = json.dumps(manifest, sort_keys=True).encode('utf-8')
+    prefix = BUNDLE_MAGIC + struct.pack('<Q', len(header)) + header
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        f.write(b'\0' * _padding(len(prefix)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return manifest['content_hash']
+
+
+class ModelBundle:
+    """A loaded bundle: the manifest, plus read-only memory-mapped views of its arrays.
+
+    The file is mapped once and every array is a view into that mapping, so workers
+    that load the same bundle share one copy in the page cache. The packed forest
+    uses the views directly; the explainer derives its quadrature matrices from the
+    stored paths, which is vectorised and takes milliseconds. verify() re-hashes the
+    file's contents.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic = f.read(len(BUNDLE_MAGIC))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"{path} is not a model bundle")
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            self.manifest = json.loads(f.read(header_length).decode('utf-8'))
+        prefix_length = len(BUNDLE_MAGIC) + 8 + header_length
+        self.payload_offset = prefix_length + _padding(prefix_length)
+        if self.manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model bundle format version: {self.manifest.get('format_version')}")
+
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        self.arrays = {}
+        for name, entry in self.manifest['arrays'].items():
+            count = int(np.prod(entry['shape'], dtype=np.int64))
+            view = np.frombuffer(self._map, dtype=np.dtype(entry['dtype']), count=count, offset=self.payload_offset + entry['offset'])
+            self.arrays[name] = view.reshape(entry['shape'])
+
+        self.population = self.manifest['population']
+        self.content_hash = self.manifest['content_hash']
+        self.columns = self.manifest['columns']
+        self.numerical_cols = self.manifest['numerical_cols']
+        self.categorical_cols = self.manifest['categorical_cols']
+        self.vocabulary = self.manifest['vocabulary']
+        self.decision_threshold = self.manifest['thresholds']['decision']
+        self.risk_category_cutoffs = tuple(self.manifest['thresholds']['risk_category_cutoffs'])
+        self.scaler = ScalerParams(self.arrays['scaler/mean'], self.arrays['scaler/scale'])
+
+    def _section(self, prefix):
+        return {name[len(prefix):]: array for name, array in self.arrays.items() if name.startswith(prefix)}
+
+    def forest(self):
+        return PackedForest.from_arrays(self._section('forest/'), self.manifest['forest'])
+
+    def explainer(self):
+        return ForestExplainer.from_arrays(self._section('explainer/'), self.manifest['explainer'])
+
+    def verify(self):
+        """Raises ValueError if the arrays or manifest no longer match the recorded content hash."""
+        manifest = {key: value for key, value in self.manifest.items() if key != 'content_hash'}
+        if _content_hash(manifest, self._map[self.payload_offset:].tobytes()) != self.content_hash:
+            raise ValueError(f"{self.path} does not match its content hash; re-run train_models.py")
+
+
+def load_bundle(path, verify=False):
+    bundle = ModelBundle(path)
+    if verify:
+        bundle.verify()
+    return bundle
+
+
+if __name__ == '__main__':
+    # Checks the bundles in --models-dir; with --write, first rebuilds them from the
+    # separate pickles, column lists and vocabulary.json, e.g. for models trained before
+    # train_models.py started writing bundles
+    import argparse
+    import joblib
+    import train_models
+    from vocabulary import load_vocabulary
+
+    parser = argparse.ArgumentParser(description="Check, or with --write rebuild, the student and professional model bundles.")
+    parser.add_argument('--models-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'),
+                        help="Directory holding the pickles, column lists, vocabulary.json and bundles")
+    parser.add_argument('--write', action='store_true', help="Rebuild the bundles from the pickles, replacing the existing ones")
+    args = parser.parse_args()
+
+    populations = {
+        'student': ('best_model_students.pkl', 'student_scaler.pkl', 'student_columns.json', train_models.numerical_cols_students,
+                    train_models.one_hot_cols_students, DEFAULT_DECISION_THRESHOLD),
+        'professional': ('best_model_professionals.pkl', 'professional_scaler.pkl', 'professional_columns.json', train_models.numerical_cols_professionals,
+                         train_models.one_hot_cols_professionals, train_models.PROFESSIONAL_DECISION_THRESHOLD),
+    }
+    vocabulary = load_vocabulary(args.models_dir) if args.write else None
+    for population, (model_file, scaler_file, columns_file, numerical_cols, categorical_cols, threshold) in populations.items():
+        path = bundle_path(args.models_dir, population)
+        if args.write:
+            with open(os.path.join(args.models_dir, columns_file), 'r') as f:
+                columns = json.load(f)
+            write_bundle(path, population, joblib.load(os.path.join(args.models_dir, model_file)),
+                         joblib.load(os.path.join(args.models_dir, scaler_file)), columns, numerical_cols,
+                         categorical_cols, vocabulary, decision_threshold=threshold)
+        try:
+            content_hash = load_bundle(path, verify=True).content_hash
+        except (OSError, ValueError) as e:
+            print(f"{population} bundle at '{path}' is unusable: {e}")
+            sys.exit(1)
+        print(f"{population} bundle {'saved to' if args.write else 'at'} '{path}' (content hash {content_hash[:12]}).")
+    sys.exit(0)
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+
+def file_signature(paths):
+    """Returns (path, inode, size, mtime) for each path, or (path, None) if it does not exist."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            signature.append((path, None))
+            continue
+        signature.append((path, st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+class ModelRegistry:
+    """Holds the active model set and swaps in a new one when the artifacts change.
+
+    `loader()` builds a complete model set (any object; the app uses a dict) and
+    `signature()` describes the artifacts on disk cheaply. A reload builds the new set
+    in the calling thread while requests keep using the old one, then replaces
+    `active` with a single reference assignment, so a request that read `active` once
+    sees one consistent set from start to finish. A failed reload keeps the old set
+    and records the error.
+
+    With watch_interval > 0, a per-process thread polls signature() and reloads once
+    a change has been stable for `settle` seconds, so a reload never starts while
+    train_models.py is still writing the files.
+    """
+
+    def __init__(self, loader, signature, on_swap=None, watch_interval=0, settle=2.0):
+        self.loader = loader
+        self.signature = signature
+        self.on_swap = on_swap
+        self.watch_interval = watch_interval
+        self.settle = settle
+        self.active = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self._loaded_signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+
+    def load(self):
+        """Builds a model set and makes it active; exceptions from the loader propagate."""
+        with self._reload_lock:
+            self._load()
+
+    def _load(self):
+        signature = self.signature()
+        started = time.perf_counter()
+        models = self.loader()
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        previous, self.active = self.active, models
+        self._loaded_signature = signature
+        self.loaded_at = time.time()
+        self.last_error = None
+        if previous is not None:
+            self.reloads += 1
+        if self.on_swap is not None:
+            self.on_swap(previous, models)
+
+    def reload(self):
+        """Reloads now. Returns True on success, False if it failed or another reload is running."""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._load()
+            return True
+        except Exception as e:
+            self.failed_reloads += 1
+            self.last_error = str(e)
+            print(f"Model reload failed, keeping the current models: {e}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self):
+        """Starts a reload thread; returns False if a reload is already running."""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, name='model-reload', daemon=True).start()
+        return True
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def ensure_watcher_started(self):
+        """Starts the file watcher in this process, once; a no-op when watching is off."""
+        if self.watch_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            # Threads do not survive a fork, so each gunicorn worker starts its own
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        pending, pending_since = None, None
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                signature = self.signature()
+            except Exception:
+                continue
+            if self.active is None or signature == self._loaded_signature:
+                pending = None
+                continue
+            if signature != pending:
+                pending, pending_since = signature, time.monotonic()
+                continue
+            if time.monotonic() - pending_since < self.settle or self.reloading:
+                continue
+            if not self.reload():
+                # Do not retry a broken set of files until they change again
+                self._loaded_signature = signature
+
+    def stats(self):
+        return {
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'reloading': self.reloading,
+            'last_error': self.last_error,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'watch_interval': self.watch_interval,
+        }
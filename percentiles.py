@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+
+PERCENTILES_FILENAME = 'risk_percentiles.npz'
+PERCENTILES_FORMAT_VERSION = 1
+
+# Cohorts a score is also ranked within, per population
+COHORT_FEATURES = {
+    'student': ['City', 'Degree'],
+    'professional': ['City', 'Profession', 'Degree'],
+}
+
+# Cohorts with fewer surveyed peers than this get no percentile of their own
+MIN_COHORT_SIZE = 20
+
+
+def _hundredths(scores):
+    """Risk scores (0-10) as integer hundredths, the precision the API reports them with."""
+    return np.rint(np.asarray(scores, dtype=np.float64) * 100).astype(np.uint16)
+
+
+def build_percentiles(scores, cohorts, min_cohort_size=MIN_COHORT_SIZE):
+    """Builds the percentile artifact's arrays.
+
+    `scores` maps each population to the risk scores of its surveyed rows, and
+    `cohorts` maps it to {feature: the rows' values of that feature}. Each population
+    gets its scores sorted; each cohort feature gets the sorted scores of every value
+    with at least min_cohort_size rows, concatenated, with the values and the offsets
+    of their runs alongside.
+    """
+    arrays = {'format_version': np.array(PERCENTILES_FORMAT_VERSION)}
+    for population, population_scores in scores.items():
+        population_scores = _hundredths(population_scores)
+        arrays[population] = np.sort(population_scores)
+        for feature, values in cohorts.get(population, {}).items():
+            values = np.asarray(values, dtype=object)
+            kept, runs = [], []
+            for value in sorted(set(values.tolist())):
+                cohort = population_scores[values == value]
+                if len(cohort) >= min_cohort_size:
+                    kept.append(str(value))
+                    runs.append(np.sort(cohort))
+            arrays[f'{population}/{feature}/values'] = np.array(kept, dtype=str)
+            arrays[f'{population}/{feature}/offsets'] = np.cumsum([0] + [len(run) for run in runs]).astype(np.int64)
+            arrays[f'{population}/{feature}/scores'] = np.concatenate(runs) if runs else np.zeros(0, dtype=np.uint16)
+    return arrays
+
+
+def save_percentiles(arrays, models_dir):
+    """Writes the artifact next to its final path and renames it into place."""
+    path = os.path.join(models_dir, PERCENTILES_FILENAME)
+    tmp_path = f'{path}.tmp{os.getpid()}.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+class PercentileIndex:
+    """Ranks a risk score among the surveyed peers of its population and cohorts.
+
+    Every distribution is a sorted array, so a lookup is one binary search: the
+    percentile of a score is the share of peers whose score is strictly lower.
+    """
+
+    def __init__(self, arrays):
+        self.populations = {}
+        self.cohorts = {}
+        for name in arrays:
+            parts = name.split('/')
+            if len(parts) == 1 and name != 'format_version':
+                self.populations[name] = arrays[name]
+            elif len(parts) == 3 and parts[2] == 'values':
+                population, feature = parts[:2]
+                scores = arrays[f'{population}/{feature}/scores']
+                offsets = arrays[f'{population}/{feature}/offsets']
+                self.cohorts[(population, feature)] = {
+                    value: scores[offsets[i]:offsets[i + 1]] for i, value in enumerate(arrays[name].tolist())
+                }
+
+    @staticmethod
+    def _rank(distribution, risk_score):
+        below = np.searchsorted(distribution, _hundredths(risk_score), side='left')
+        return round(100.0 * below / len(distribution), 1)
+
+    def percentile(self, population, risk_score):
+        """Returns the percentage of the population scored lower than risk_score, or None."""
+        distribution = self.populations.get(population)
+        if distribution is None or len(distribution) == 0:
+            return None
+        return self._rank(distribution, risk_score)
+
+    def cohort_percentiles(self, population, risk_score, record):
+        """Returns {feature: {'value', 'percentile', 'peers'}} for the record's cohorts that have a distribution."""
+        results = {}
+        for feature in COHORT_FEATURES.get(population, []):
+            distribution = self.cohorts.get((population, feature), {}).get(str(record.get(feature)))
+            if distribution is not None:
+                results[feature] = {
+                    'value': record.get(feature),
+                    'percentile': self._rank(distribution, risk_score),
+                    'peers': len(distribution),
+                }
+        return results
+
+
+def out_of_bag_probabilities(model, X_train):
+    """Returns (probabilities, covered) for the rows a bootstrapped forest was fitted on.
+
+    Each row's positive-class probability is averaged over the trees whose bootstrap
+    sample left it out, as a respondent the forest never saw would be scored.
+    `covered` marks the rows at least one tree left out; `probabilities` holds theirs.
+    X_train must be the training rows, in the order the forest was fitted on, and
+    each tree's sample is regenerated from its random_state with scikit-learn's
+    private helpers, as oob_decision_function_ is (pinned scikit-learn==1.2.1).
+    """
+    from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+
+    X = np.asarray(X_train.toarray() if hasattr(X_train, 'toarray') else X_train, dtype=np.float32)
+    n_samples = len(X)
+    sums, counts = np.zeros(n_samples), np.zeros(n_samples)
+    if model.bootstrap:
+        n_bootstrap = _get_n_samples_bootstrap(n_samples, model.max_samples)
+        for estimator in model.estimators_:
+            rows = _generate_unsampled_indices(estimator.random_state, n_samples, n_bootstrap)
+            sums[rows] += estimator.predict_proba(X[rows])[:, 1]
+            counts[rows] += 1
+    covered = counts > 0
+    return sums[covered] / counts[covered], covered
+
+
+def load_percentiles(models_dir):
+    """Loads the artifact; raises FileNotFoundError if train_models.py has not written one."""
+    with np.load(os.path.join(models_dir, PERCENTILES_FILENAME), allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    if int(arrays.get('format_version', -1)) != PERCENTILES_FORMAT_VERSION:
+        raise ValueError(f"Unsupported percentile format version: {arrays.get('format_version')}")
+    return PercentileIndex(arrays)
+
+
+if __name__ == '__main__':
+    # Rebuilds models/risk_percentiles.npz from the dataset and the saved models,
+    # e.g. for models trained before train_models.py started writing it
+    import joblib
+    import pandas as pd
+    import train_models
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    models_dir = os.path.join(base_dir, 'models')
+    encoded = train_models.encode_dataset(pd.read_csv(os.path.join(base_dir, train_models.DATASET_PATH)))
+    models = {
+        'student': joblib.load(os.path.join(models_dir, 'best_model_students.pkl')),
+        'professional': joblib.load(os.path.join(models_dir, 'best_model_professionals.pkl')),
+    }
+    save_percentiles(build_percentiles(*train_models.peer_distributions(encoded, models)), models_dir)
+    print(f"Risk score percentiles saved to '{os.path.join(models_dir, PERCENTILES_FILENAME)}'.")
@@ -1,21 +1,60 @@
+import argparse
 import json
 import os
-import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 
 # --- Configuration ---
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-STUDENT_RESOURCES_PATH = os.path.join(DATA_DIR, 'student_resources.json')
-PROFESSIONAL_RESOURCES_PATH = os.path.join(DATA_DIR, 'professional_resources.json')
 
-# Search queries for Semantic Scholar
+# Queries to run, per resource file; see load_config
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'research_queries.json')
+
+# Search queries for Semantic Scholar, used when there is no config file
 STUDENT_RESEARCH_QUERY = "mental health college students"
 PROFESSIONAL_RESEARCH_QUERY = "workplace mental health burnout"
 
-# Semantic Scholar API Endpoint
-SEMANTIC_SCHOLAR_API_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+# Semantic Scholar bulk search endpoint, the one that can sort by publication date;
+# SEMANTIC_SCHOLAR_API_URL overrides it (e.g. with a local stub server)
+SEMANTIC_SCHOLAR_API_URL = os.environ.get('SEMANTIC_SCHOLAR_API_URL', "https://api.semanticscholar.org/graph/v1/paper/search/bulk")
+
+DEFAULT_CONFIG = {
+    'api_url': SEMANTIC_SCHOLAR_API_URL,
+    'data_dir': DATA_DIR,
+    # Unauthenticated clients share a pool of about one request per second
+    'requests_per_second': 1.0,
+    'burst': 1,
+    'workers': 4,
+    'max_pages': 3,  # Of up to 1000 papers each
+    'max_retries': 5,
+    'initial_delay': 5,
+    'max_papers': 50,  # Papers kept per resource file, newest first
+    'queries': [
+        {'resource': 'student', 'query': STUDENT_RESEARCH_QUERY},
+        {'resource': 'professional', 'query': PROFESSIONAL_RESEARCH_QUERY},
+    ],
+}
+
+PAPER_FIELDS = 'title,abstract,url,publicationDate'
+# Newest first, so a search cut short by max_pages only misses papers older than all it returned
+PAPER_SORT = 'publicationDate:desc'
 
 # --- Helper Functions ---
+def load_config(path=CONFIG_PATH):
+    """Returns DEFAULT_CONFIG updated with the JSON object at `path`, if it exists."""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+def resources_path(resource, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f'{resource}_resources.json')
+
 def load_resources(file_path):
     if not os.path.exists(file_path):
         return {"Support & Awareness Platforms": [], "Research & Studies": [], "Suggestions": []}
@@ -25,125 +64,189 @@ def load_resources(file_path):
     except (json.JSONDecodeError, FileNotFoundError):
         return {"Support & Awareness Platforms": [], "Research & Studies": [], "Suggestions": []}
 
-def save_resources(file_path, resources):
+def save_resources(file_path, resources, max_papers=50):
     # This function now expects resources["Research & Studies"] to be already sorted and deduplicated
-    resources["Research & Studies"] = resources.get("Research & Studies", [])[:50] # Keep latest 50 after sorting
-    with open(file_path, 'w', encoding='utf-8') as f:
+    resources["Research & Studies"] = resources.get("Research & Studies", [])[:max_papers] # Keep latest papers after sorting
+    # Written next to the file and renamed into place, so the app never reads half a file
+    tmp_path = f'{file_path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(resources, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+
+def latest_publication_date(papers):
+    """Returns the newest publicationDate among papers ('YYYY-MM-DD'), or None."""
+    dates = [paper.get('publicationDate') for paper in papers if paper.get('publicationDate')]
+    return max(dates) if dates else None
+
+def merge_papers(existing, new):
+    """Deduplicates by URL, keeping the entry with the latest publication date, and sorts newest first."""
+    unique_papers = {}
+    for paper in existing + new:
+        url = paper.get('url')
+        pub_date = paper.get('publicationDate')
+        if url and pub_date: # Ensure URL and publicationDate exist
+            if url not in unique_papers or pub_date > unique_papers[url].get('publicationDate', ''):
+                unique_papers[url] = paper
+    return sorted(unique_papers.values(), key=lambda x: x.get('publicationDate', ''), reverse=True)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
 
-def scrape_semantic_scholar(query, max_retries=5, initial_delay=60):
-    results = []
-    for retry_num in range(max_retries):
-        try:
-            params = {
-                'query': query,
-                'limit': 10,  # Number of results per page
-                'fields': 'title,abstract,url,publicationDate',
-                'sort': 'publicationDate:desc' # Sort by publication date, newest first
-            }
-            print(f"Attempt {retry_num + 1} for query: {query}")
-            response = requests.get(SEMANTIC_SCHOLAR_API_URL, params=params)
-            response.raise_for_status() # Raise an exception for HTTP errors
-            data = response.json()
-            
-            if 'data' in data:
-                for paper in data['data']:
-                    title = paper.get('title', 'No Title')
-                    description = paper.get('abstract') # Get abstract, will be None if not present
-                    url = paper.get('url', '#') # Default to '#' if url is missing
-                    publication_date = paper.get('publicationDate') # Get publication date
-
-                    # Only add paper if it has a description (abstract) AND a valid URL (not just '#')
-                    if description and description.strip() and url and url != '#':
-                        results.append({
-                            "title": title,
-                            "description": description,
-                            "url": url,
-                            "publicationDate": publication_date # Store publication date
-                        })
-            else:
-                print(f"No data found for query: {query}")
-            return results # Success! Exit the retry loop
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429: # Too Many Requests
-                delay = initial_delay * (2 ** retry_num) # Exponential backoff
-                print(f"Rate limit hit for query '{query}'. Retrying in {delay} seconds...")
+class SemanticScholarClient:
+    """Pages through Semantic Scholar paper searches over one pooled session.
+
+    Every request, from any thread, first takes a token from the shared bucket. A 429
+    is retried after the server's Retry-After, or else an exponential backoff from
+    `initial_delay` seconds.
+    """
+
+    def __init__(self, api_url, rate_limiter, max_pages=3, max_retries=5, initial_delay=5,
+                 api_key=None, pool_size=4, session=None):
+        self.api_url = api_url
+        self.rate_limiter = rate_limiter
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.session = session or requests.Session()
+        self.session.mount(api_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        if api_key:
+            self.session.headers['x-api-key'] = api_key
+
+    def get_page(self, params):
+        """Returns one page of search results as parsed JSON."""
+        for retry_num in range(self.max_retries):
+            self.rate_limiter.acquire()
+            response = self.session.get(self.api_url, params=params, timeout=30)
+            if response.status_code == 429: # Too Many Requests
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else self.initial_delay * (2 ** retry_num)
+                print(f"Rate limit hit for query '{params['query']}'. Retrying in {delay} seconds...")
                 time.sleep(delay)
-            else:
-                print(f"HTTP Error fetching from Semantic Scholar for query '{query}': {e}")
-                break # For other HTTP errors, don't retry
-        except requests.exceptions.RequestException as e:
-            print(f"Network or other request error for query '{query}': {e}")
-            break # For network errors, don't retry immediately
-        except KeyError as e:
-            print(f"Error parsing Semantic Scholar response for query '{query}': Missing key {e}")
-            break
-    print(f"Failed to fetch data for query '{query}' after {max_retries} retries.")
-    return [] # Return empty list if all retries fail
-
-def update_research_papers():
-    print("Updating student research papers...")
-    student_resources = load_resources(STUDENT_RESOURCES_PATH)
-    student_research = scrape_semantic_scholar(STUDENT_RESEARCH_QUERY)
-    
-    if student_research:
-        all_student_papers = student_resources.get("Research & Studies", []) + student_research
-        
-        # Use a dictionary for deduplication, keeping the entry with the latest publication date
-        unique_student_papers_dict = {}
-        for paper in all_student_papers:
-            url = paper.get('url')
-            pub_date = paper.get('publicationDate')
-            
-            if url and pub_date: # Ensure URL and publicationDate exist
-                if url not in unique_student_papers_dict or pub_date > unique_student_papers_dict[url].get('publicationDate', ''):
-                    unique_student_papers_dict[url] = paper
-        
-        # Convert dictionary values back to a list and sort by publicationDate (descending)
-        sorted_student_papers = sorted(list(unique_student_papers_dict.values()), 
-                                      key=lambda x: x.get('publicationDate', ''), 
-                                      reverse=True)
-        student_resources["Research & Studies"] = sorted_student_papers
-        save_resources(STUDENT_RESOURCES_PATH, student_resources)
-        print(f"Updated student research papers. Total: {len(sorted_student_papers)}")
-    else:
-        print("No new student research papers found or failed to fetch.")
-    
-    # No fixed time.sleep() between calls here, as scrape_semantic_scholar now handles its own delays
-    # if it retries. This ensures calls are not too frequent if previous one failed.
-    # However, if the first call succeeded quickly, we might still want a small buffer.
-    time.sleep(10) # Small buffer between successful API calls
-
-    print("Updating professional research papers...")
-    professional_resources = load_resources(PROFESSIONAL_RESOURCES_PATH)
-    professional_research = scrape_semantic_scholar(PROFESSIONAL_RESEARCH_QUERY)
-    
-    if professional_research:
-        all_professional_papers = professional_resources.get("Research & Studies", []) + professional_research
-
-        # Use a dictionary for deduplication, keeping the entry with the latest publication date
-        unique_professional_papers_dict = {}
-        for paper in all_professional_papers:
-            url = paper.get('url')
-            pub_date = paper.get('publicationDate')
-            
-            if url and pub_date: # Ensure URL and publicationDate exist
-                if url not in unique_professional_papers_dict or pub_date > unique_professional_papers_dict[url].get('publicationDate', ''):
-                    unique_professional_papers_dict[url] = paper
-
-        # Convert dictionary values back to a list and sort by publicationDate (descending)
-        sorted_professional_papers = sorted(list(unique_professional_papers_dict.values()), 
-                                          key=lambda x: x.get('publicationDate', ''), 
-                                          reverse=True)
-        professional_resources["Research & Studies"] = sorted_professional_papers
-        save_resources(PROFESSIONAL_RESOURCES_PATH, professional_resources)
-        print(f"Updated professional research papers. Total: {len(sorted_professional_papers)}")
-    else:
-        print("No new professional research papers found or failed to fetch.")
+                continue
+            response.raise_for_status() # Raise an exception for other HTTP errors
+            return response.json()
+        raise requests.exceptions.RetryError(f"Still rate limited after {self.max_retries} attempts")
+
+    def search(self, query, since=None, max_results=None):
+        """Returns the papers with an abstract and a URL matching `query`, published on or after `since`.
+
+        Results come newest first. Follows the response's `token` for up to max_pages
+        pages, stopping early once max_results papers have been collected: any further
+        ones would be older than all of those.
+        """
+        params = {'query': query, 'fields': PAPER_FIELDS, 'sort': PAPER_SORT}
+        if since:
+            # Inclusive; a paper from that day that is already stored is deduplicated on merge
+            params['publicationDateOrYear'] = f'{since}:'
+        results = []
+        for _ in range(self.max_pages):
+            data = self.get_page(params)
+            for paper in data.get('data') or []:
+                description = paper.get('abstract') # Will be None if not present
+                url = paper.get('url', '#')
+                # Only add paper if it has a description (abstract) AND a valid URL (not just '#')
+                if description and description.strip() and url and url != '#':
+                    results.append({
+                        "title": paper.get('title', 'No Title'),
+                        "description": description,
+                        "url": url,
+                        "publicationDate": paper.get('publicationDate'),
+                    })
+            if not data.get('token') or (max_results is not None and len(results) >= max_results):
+                break
+            params['token'] = data['token']
+        return results
+
+
+def fetch_query(client, query, since, max_results=None):
+    try:
+        papers = client.search(query, since=since, max_results=max_results)
+        print(f"Fetched {len(papers)} papers for query '{query}'" + (f" published since {since}." if since else "."))
+        return papers
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Failed to fetch data for query '{query}': {e}")
+        return None
+
+def update_research_papers(config=None, client=None):
+    """Runs every configured query concurrently and merges new papers into the resource files.
+
+    Each query only asks for papers published on or after the newest one already in
+    its resource file, newest first. Every paper it returns is at least as new as the
+    stored ones, so once a query has max_papers of them the rest could not be kept
+    and are not fetched. A file is rewritten only if new papers were added. Returns
+    {resource: number of papers added}.
+    """
+    config = config or load_config()
+    client = client or SemanticScholarClient(
+        config['api_url'],
+        TokenBucket(config['requests_per_second'], config['burst']),
+        max_pages=config['max_pages'],
+        max_retries=config['max_retries'],
+        initial_delay=config['initial_delay'],
+        api_key=os.environ.get('SEMANTIC_SCHOLAR_API_KEY'),
+        pool_size=config['workers'],
+    )
+
+    resources = {}
+    for entry in config['queries']:
+        if entry['resource'] not in resources:
+            resources[entry['resource']] = load_resources(resources_path(entry['resource'], config['data_dir']))
+    since = {resource: latest_publication_date(data.get("Research & Studies", [])) for resource, data in resources.items()}
+
+    with ThreadPoolExecutor(max_workers=config['workers']) as pool:
+        futures = [(entry['resource'], pool.submit(fetch_query, client, entry['query'], since[entry['resource']], config['max_papers']))
+                   for entry in config['queries']]
+        fetched = {resource: [] for resource in resources}
+        for resource, future in futures:
+            fetched[resource] += future.result() or []
+
+    added = {}
+    for resource, data in resources.items():
+        existing = data.get("Research & Studies", [])
+        merged = merge_papers(existing, fetched[resource])[:config['max_papers']]
+        added[resource] = len({paper['url'] for paper in merged} - {paper.get('url') for paper in existing})
+        if merged == existing:
+            print(f"No new {resource} research papers found.")
+            continue
+        data["Research & Studies"] = merged
+        save_resources(resources_path(resource, config['data_dir']), data, config['max_papers'])
+        print(f"Updated {resource} research papers. Added: {added[resource]}, total: {len(merged)}")
+    return added
 
 if __name__ == "__main__":
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    update_research_papers()
-    print("Research scraper finished.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch new research papers into data/<resource>_resources.json.")
+    parser.add_argument('--config', default=CONFIG_PATH, help="JSON file with the queries and rate limit settings")
+    parser.add_argument('--api-url', help="Search endpoint to use instead of the configured one (e.g. a local stub)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.api_url:
+        config['api_url'] = args.api_url
+    if not os.path.exists(config['data_dir']):
+        os.makedirs(config['data_dir'])
+    update_research_papers(config)
+    print("Research scraper finished.")
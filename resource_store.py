@@ -0,0 +1,88 @@
+import json
+import os
+import random
+import threading
+
+# What a resource page shows when its file is missing or unreadable
+EMPTY_RESOURCES = {"Support & Awareness Platforms": [], "Research & Studies": [], "Suggestions": []}
+
+
+class ResourceEntry:
+    """One parsed resources file, plus what the app derives from it."""
+
+    def __init__(self, resources, signature):
+        self.resources = resources
+        self.signature = signature
+        self.suggestions = list(resources.get("Suggestions", []))
+        # Partial Fisher-Yates state for sample_suggestions; any permutation will do
+        self._order = list(range(len(self.suggestions)))
+        self._lock = threading.Lock()
+        # (html, etag) once the page has been rendered for this version of the file
+        self.page = None
+
+    def sample_suggestions(self, k, rng=random):
+        """Returns k distinct suggestions in random order, in O(k) time.
+
+        Each call runs k steps of a Fisher-Yates shuffle over a persistent index
+        permutation; whatever order earlier calls left behind, the first k slots
+        are a uniformly random k-subset afterwards.
+        """
+        n = len(self.suggestions)
+        k = min(k, n)
+        with self._lock:
+            order = self._order
+            for i in range(k):
+                j = rng.randrange(i, n)
+                order[i], order[j] = order[j], order[i]
+            picked = order[:k]
+        return [self.suggestions[i] for i in picked]
+
+
+class ResourceStore:
+    """Serves data/<user_type>_resources.json from memory, re-parsing a file only when it changes.
+
+    A file counts as changed when its inode, size or mtime differs from when it was
+    last parsed, which covers both in-place writes and the rename that a git checkout
+    of the monthly research_scraper.py commit does. One os.stat per lookup is all the
+    steady state costs.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def path(self, user_type):
+        return os.path.join(self.data_dir, f'{user_type}_resources.json')
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, user_type):
+        """Returns the current ResourceEntry for 'student' or 'professional'."""
+        path = self.path(user_type)
+        signature = self._signature(path)
+        entry = self._entries.get(user_type)
+        if entry is not None and signature is not None and entry.signature == signature:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(user_type)
+            if entry is not None and signature is not None and entry.signature == signature:
+                return entry
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    resources = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                # Not cached under a signature, so the next lookup tries again
+                return ResourceEntry(EMPTY_RESOURCES, None)
+            entry = ResourceEntry(resources, signature)
+            self._entries[user_type] = entry
+            self.reloads += 1
+            return entry
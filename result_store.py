@@ -0,0 +1,124 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def new_result_id():
+    """Returns a short, unguessable URL-safe id (64 random bits, 11 characters)."""
+    return secrets.token_urlsafe(8)
+
+
+class MemoryResultStore:
+    """Keeps scored results in this process for `ttl` seconds, evicting the oldest beyond max_size.
+
+    Results are only visible to the process that stored them, so run a single worker
+    (gunicorn's default) or use SQLiteResultStore when there are several.
+    """
+
+    def __init__(self, ttl=3600, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, result, result_id=None):
+        result_id = result_id or new_result_id()
+        with self._lock:
+            self._entries.pop(result_id, None)
+            self._entries[result_id] = (time.monotonic() + self.ttl, result)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def update(self, result_id, changes):
+        """Merges `changes` into a stored result, keeping its expiry; returns False if it is gone."""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None or time.monotonic() > entry[0]:
+                return False
+            self._entries[result_id] = (entry[0], dict(entry[1], **changes))
+            return True
+
+    def get(self, result_id):
+        """Returns the stored result, or None if the id is unknown or has expired."""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None:
+                return None
+            if time.monotonic() > entry[0]:
+                del self._entries[result_id]
+                return None
+            return entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'size': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl}
+
+
+class SQLiteResultStore:
+    """Keeps scored results in a SQLite file shared by every worker on the host.
+
+    Each thread opens its own connection; the database runs in WAL mode so readers in
+    one worker do not block the writer in another. Expired rows are deleted on put.
+    Stores with different `table`s share the file without seeing each other's rows.
+    """
+
+    def __init__(self, path, ttl=3600, table='results'):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be used across a fork; reopen in the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, result, result_id=None):
+        result_id = result_id or new_result_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE expires_at < ?', (now,))
+            conn.execute(f'INSERT OR REPLACE INTO {self.table} (id, payload, expires_at) VALUES (?, ?, ?)',
+                         (result_id, json.dumps(result, separators=(',', ':')), now + self.ttl))
+        return result_id
+
+    def update(self, result_id, changes):
+        """Merges `changes` into a stored result, keeping its expiry; returns False if it is gone."""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT payload FROM {self.table} WHERE id = ? AND expires_at >= ?', (result_id, time.time())).fetchone()
+            if row is None:
+                return False
+            conn.execute(f'UPDATE {self.table} SET payload = ? WHERE id = ?',
+                         (json.dumps(dict(json.loads(row[0]), **changes), separators=(',', ':')), result_id))
+        return True
+
+    def get(self, result_id):
+        """Returns the stored result, or None if the id is unknown or has expired."""
+        row = self._connect().execute(f'SELECT payload FROM {self.table} WHERE id = ? AND expires_at >= ?',
+                                      (result_id, time.time())).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def stats(self):
+        size = self._connect().execute(f'SELECT COUNT(*) FROM {self.table} WHERE expires_at >= ?', (time.time(),)).fetchone()[0]
+        return {'backend': 'sqlite', 'path': self.path, 'size': size, 'ttl': self.ttl}
+
+
+def make_result_store(db_path=None, ttl=3600, max_size=10000, table='results'):
+    """Returns a SQLiteResultStore at db_path if one is given, else a MemoryResultStore."""
+    if db_path:
+        return SQLiteResultStore(db_path, ttl=ttl, table=table)
+    return MemoryResultStore(ttl=ttl, max_size=max_size)
@@ -5,6 +5,19 @@ document.addEventListener('DOMContentLoaded', function() {
     const suggestionsList = document.getElementById('suggestions-list');
     const shuffleButton = document.getElementById('shuffle-suggestions');
 
+    // Replaces the form with the result page returned by /predict/...?inline=1 and points
+    // the address bar at /result/<id>, so reloading or sharing the page still works
+    function showResult(result) {
+        if (!result.html) {
+            window.location.href = result.redirect_url;
+            return;
+        }
+        history.pushState(null, '', result.redirect_url);
+        document.open();
+        document.write(result.html);
+        document.close();
+    }
+
     // Student Form Submission
     if (studentForm) {
         studentForm.addEventListener('submit', async function(event) {
@@ -20,7 +33,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data['Work/Study Hours']) data['Work/Study Hours'] = parseInt(data['Work/Study Hours']);
 
             try {
-                const response = await fetch('/predict/student', {
+                const response = await fetch('/predict/student?inline=1', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify(data)
@@ -28,9 +41,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
                 const result = await response.json();
                 
-                // Redirect to the result page
+                // Show the result page the server rendered inline, or fall back to the redirect
                 if (result.redirect_url) {
-                    window.location.href = result.redirect_url;
+                    showResult(result);
                 } else {
                     console.error('Error: No redirect URL found in response.');
                     if (predictionResultDiv) {
@@ -97,7 +110,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data['Work/Study Hours']) data['Work/Study Hours'] = parseInt(data['Work/Study Hours']);
 
             try {
-                const response = await fetch('/predict/professional', {
+                const response = await fetch('/predict/professional?inline=1', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify(data)
@@ -105,9 +118,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
                 const result = await response.json();
 
-                // Redirect to the result page
+                // Show the result page the server rendered inline, or fall back to the redirect
                 if (result.redirect_url) {
-                    window.location.href = result.redirect_url;
+                    showResult(result);
                 } else {
                     console.error('Error: No redirect URL found in response.');
                     if (predictionResultDiv) {
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import research_scraper
+
+PAGE_SIZE = 5
+
+
+def make_paper(day):
+    return {'title': f'Paper {day}', 'abstract': f'Abstract {day}', 'url': f'https://example.org/{day}',
+            'publicationDate': f'2024-01-{day:02d}'}
+
+
+class StubSearch(BaseHTTPRequestHandler):
+    """Serves bulk search: papers newest first, filtered by publicationDateOrYear, PAGE_SIZE per token."""
+
+    papers = []
+    requests = []
+
+    def do_GET(self):
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        self.requests.append(params)
+        papers = sorted(self.papers, key=lambda paper: paper['publicationDate'], reverse=True)
+        since = params.get('publicationDateOrYear', '').rstrip(':')
+        papers = [paper for paper in papers if paper['publicationDate'] >= since]
+        start = int(params.get('token', 0))
+        body = {'total': len(papers), 'data': papers[start:start + PAGE_SIZE]}
+        if start + PAGE_SIZE < len(papers):
+            body['token'] = str(start + PAGE_SIZE)
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubSearch.papers = [make_paper(day) for day in range(1, 21)]
+    StubSearch.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSearch)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/graph/v1/paper/search/bulk'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def config(stub, tmp_path):
+    return dict(research_scraper.DEFAULT_CONFIG, api_url=stub, data_dir=str(tmp_path), requests_per_second=1000,
+                burst=10, workers=2, max_pages=10, max_papers=12,
+                queries=[{'resource': 'student', 'query': 'student stress'}])
+
+
+def stored_papers(config):
+    with open(research_scraper.resources_path('student', config['data_dir']), encoding='utf-8') as f:
+        return json.load(f)['Research & Studies']
+
+
+def test_follows_tokens_newest_first_until_max_papers(config):
+    assert research_scraper.update_research_papers(config) == {'student': 12}
+
+    # Pages of 5 are followed by token until 12 papers are held, then paging stops
+    assert [params.get('token') for params in StubSearch.requests] == [None, '5', '10']
+    assert all(params['sort'] == 'publicationDate:desc' for params in StubSearch.requests)
+    assert [paper['publicationDate'] for paper in stored_papers(config)] == [f'2024-01-{day:02d}' for day in range(20, 8, -1)]
+
+
+def test_asks_only_for_papers_since_the_newest_stored(config):
+    research_scraper.update_research_papers(config)
+    StubSearch.requests.clear()
+    StubSearch.papers.append(make_paper(25))
+
+    assert research_scraper.update_research_papers(config) == {'student': 1}
+
+    assert [params.get('publicationDateOrYear') for params in StubSearch.requests] == ['2024-01-20:']
+    papers = stored_papers(config)
+    assert papers[0]['publicationDate'] == '2024-01-25'
+    assert len(papers) == 12
+
+
+def test_leaves_the_file_alone_without_new_papers(config):
+    research_scraper.update_research_papers(config)
+    path = research_scraper.resources_path('student', config['data_dir'])
+    with open(path, 'rb') as f:
+        before = f.read()
+    # A rewrite renames a new file into place, which changes the inode
+    stat = os.stat(path)
+    StubSearch.requests.clear()
+
+    assert research_scraper.update_research_papers(config) == {'student': 0}
+
+    assert len(StubSearch.requests) == 1
+    assert (os.stat(path).st_ino, os.stat(path).st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+    with open(path, 'rb') as f:
+        assert f.read() == before
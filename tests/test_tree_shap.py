@@ -0,0 +1,37 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from tree_shap import ForestExplainer, verify_against_shap
+
+pytest.importorskip('shap')
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+MODEL_FILES = {
+    'student': 'best_model_students.pkl',
+    'professional': 'best_model_professionals.pkl',
+}
+# Largest absolute difference from shap.TreeExplainer allowed for any SHAP value
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope='module', params=sorted(MODEL_FILES))
+def model(request):
+    return joblib.load(os.path.join(MODELS_DIR, MODEL_FILES[request.param]))
+
+
+def test_matches_shap_tree_explainer_on_a_batch(model):
+    # A batch of rows sampled around the split thresholds; also checks additivity and column restriction
+    max_diff = verify_against_shap(model, n_rows=200, atol=TOLERANCE)
+    assert max_diff <= TOLERANCE
+
+
+def test_single_rows_match_the_batch(model):
+    explainer = ForestExplainer(model)
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(20, explainer.n_features))
+    batch = explainer.shap_values(X)
+    single = np.vstack([explainer.shap_values(X[i:i + 1]) for i in range(len(X))])
+    np.testing.assert_allclose(single, batch, rtol=0, atol=TOLERANCE)
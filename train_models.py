@@ -1,31 +1,39 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix, roc_curve, auc
 from sklearn.ensemble import RandomForestClassifier
+from scipy.stats import randint
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import hashlib
 import joblib
 import os
 import json
 import numpy as np
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
+from dataset_loader import DEFAULT_CHUNK_SIZE, load_populations, open_dataset, split_populations
+from forest_compression import compression_candidates, select_candidate
+from model_bundle import DEFAULT_DECISION_THRESHOLD, bundle_path, write_bundle
+from percentiles import COHORT_FEATURES, build_percentiles, out_of_bag_probabilities, save_percentiles
+from vocabulary import build_vocabulary, save_vocabulary
 
-# --- Data Loading and Preprocessing ---
-print("Loading and preprocessing data...")
-df = pd.read_csv("final_depression_dataset_1.csv")
-
-# Separate the dataset
-students_df = df[df['Working Professional or Student'] == "Student"].copy()
-professionals_df = df[df['Working Professional or Student'] == "Working Professional"].copy()
+DATASET_PATH = "final_depression_dataset_1.csv"
+MODELS_DIR = 'models'
+CACHE_DIR = '.training_cache'
+COMPRESSION_REPORT_PATH = 'compression_report.json'
 
-# Drop unnecessary columns
-students_df = students_df.drop(columns=["Work Pressure", "Profession", "Job Satisfaction"])
-professionals_df = professionals_df.drop(columns=["Academic Pressure", "CGPA", "Study Satisfaction"])
+# Probability cutoff the professional model is evaluated (and bundled) with
+PROFESSIONAL_DECISION_THRESHOLD = 0.445
 
-# Drop rows with missing values (initial clean-up)
-students_df = students_df.dropna()
-professionals_df = professionals_df.dropna()
+# With --compress, the smallest candidate whose test AUC is within this of the best candidate's is shipped
+DEFAULT_AUC_TOLERANCE = 0.005
 
-# --- Feature Engineering and Encoding ---
+# Bump whenever encode_dataset changes so stale cached matrices are not reused
+ENCODING_VERSION = 2
 
 binary_columns = ['Gender', 'Have you ever had suicidal thoughts ?', 'Family History of Mental Illness']
 one_hot_cols_students = ['City', 'Dietary Habits', 'Sleep Duration', 'Degree', 'Academic Pressure', 'Study Satisfaction', 'Financial Stress']
@@ -33,141 +41,384 @@ one_hot_cols_professionals = ['City', 'Dietary Habits', 'Sleep Duration', 'Degre
 numerical_cols_students = ['Age', 'CGPA', 'Work/Study Hours']
 numerical_cols_professionals = ['Age', 'Work/Study Hours']
 
-label_encoder = LabelEncoder()
-
-# Process Students Data
-for col in binary_columns:
-    students_df[col] = label_encoder.fit_transform(students_df[col])
-
-
-students_df = pd.get_dummies(students_df, columns=one_hot_cols_students)
-
-
-# Process Professionals Data
-for col in binary_columns:
-    professionals_df[col] = label_encoder.fit_transform(professionals_df[col])
-
-
-professionals_df = pd.get_dummies(professionals_df, columns=one_hot_cols_professionals)
-
-
-# --- Prepare Data for Modeling ---
-X_students = students_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-y_students = label_encoder.fit_transform(students_df["Depression"])
-
-X_professionals = professionals_df.drop(columns=["Depression", "Working Professional or Student", "Name"])
-y_professionals = label_encoder.fit_transform(professionals_df["Depression"])
+# Define the parameter grid from application.py
+param_grid = {
+    'n_estimators': [10,20,30,40,50],
+    'max_depth': [5,10],
+    'min_samples_split': [2,3,4]
+}
 
-# Split data before scaling to prevent data leakage
-X_train_stu, X_test_stu, y_train_stu, y_test_stu = train_test_split(X_students, y_students, test_size=0.2, random_state=42, stratify=y_students)
-X_train_pro, X_test_pro, y_train_pro, y_test_pro = train_test_split(X_professionals, y_professionals, test_size=0.2, random_state=42, stratify=y_professionals)
+# The same ranges as param_grid, sampled by --search random
+param_distributions = {
+    'n_estimators': randint(10, 51),
+    'max_depth': [5, 10],
+    'min_samples_split': randint(2, 5)
+}
 
-# Clip Age after one-hot encoding and before scaling
-X_train_stu['Age'] = X_train_stu['Age'].clip(15, 65)
-X_test_stu['Age'] = X_test_stu['Age'].clip(15, 65)
-X_train_pro['Age'] = X_train_pro['Age'].clip(15, 65)
-X_test_pro['Age'] = X_test_pro['Age'].clip(15, 65)
 
-# --- Feature Scaling ---
-student_scaler = StandardScaler()
-X_train_stu[numerical_cols_students] = student_scaler.fit_transform(X_train_stu[numerical_cols_students])
-X_test_stu[numerical_cols_students] = student_scaler.transform(X_test_stu[numerical_cols_students])
+# --- Data Loading and Preprocessing ---
+def encode_dataset(df, sparse=False):
+    """Splits, encodes, clips and scales an in-memory dataset exactly as the served models expect."""
+    return encode_populations(split_populations(df), df, sparse)
+
+
+def one_hot_encode(df, one_hot_cols, sparse=False):
+    """Returns (indicator matrix, column names) for one-hot columns that are categoricals.
+
+    The columns, names and values are those pd.get_dummies(df, columns=one_hot_cols)
+    appends: one column per category, in category order. Dense output is a single
+    preallocated uint8 block. Sparse output is a float64 CSR matrix built straight
+    from the category codes, with exactly one stored value per one-hot column per
+    row, so its size does not depend on how many cities, degrees or professions
+    there are.
+    """
+    names, offsets = [], []
+    for col in one_hot_cols:
+        offsets.append(len(names))
+        names += [f"{col}_{value}" for value in df[col].cat.categories]
+    # Offsets grow with the column position, so each row's indices come out sorted
+    indices = np.column_stack([offset + df[col].cat.codes.to_numpy().astype(np.int64) for col, offset in zip(one_hot_cols, offsets)])
+    if sparse:
+        indptr = np.arange(0, indices.size + 1, len(one_hot_cols), dtype=np.int64)
+        return sp.csr_matrix((np.ones(indices.size), indices.ravel(), indptr), shape=(len(df), len(names))), names
+    dummies = np.zeros((len(df), len(names)), dtype=np.uint8)
+    dummies[np.arange(len(df))[:, None], indices] = 1
+    return dummies, names
+
+
+def encode_population(df, one_hot_cols, numerical_cols, sparse=False):
+    """Label-encodes, splits, clips, scales and one-hot encodes one population's frame.
+
+    Returns ((X_train, X_test, y_train, y_test, scaler), columns). The split is drawn
+    on row positions before encoding, so only the train and test matrices themselves
+    are ever materialised. X_train and X_test are DataFrames, or with sparse=True
+    CSR matrices with the same columns and values, which the forests train on
+    directly.
+    """
+    label_encoder = LabelEncoder()
+    X = df.drop(columns=["Depression"])
+    y = label_encoder.fit_transform(df["Depression"])
+    for col in binary_columns:
+        X[col] = label_encoder.fit_transform(X[col])
+    for col in one_hot_cols:
+        # Only the values left after dropna get a one-hot column, in sorted order as with get_dummies
+        column = X[col].cat.remove_unused_categories() if isinstance(X[col].dtype, pd.CategoricalDtype) else X[col]
+        X[col] = column.astype('category')
+
+    # Split data before scaling to prevent data leakage
+    train_rows, test_rows = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+
+    def encode(rows, fit):
+        part = X.iloc[rows]
+        other = part.drop(columns=one_hot_cols)
+        # Clip Age before scaling
+        other['Age'] = other['Age'].clip(15, 65)
+        other[numerical_cols] = (scaler.fit_transform if fit else scaler.transform)(other[numerical_cols])
+        one_hot, names = one_hot_encode(part, one_hot_cols, sparse=sparse)
+        columns = other.columns.tolist() + names
+        if sparse:
+            return sp.hstack([sp.csr_matrix(other.to_numpy(dtype=np.float64)), one_hot], format='csr'), columns
+        return pd.concat([other, pd.DataFrame(one_hot, index=part.index, columns=names)], axis=1, copy=False), columns
+
+    X_train, columns = encode(train_rows, fit=True)
+    X_test, _ = encode(test_rows, fit=False)
+    return (X_train, X_test, y[train_rows], y[test_rows], scaler), columns
+
+
+def encode_populations(populations, vocabulary_df, sparse=False):
+    """Encodes the split_populations frames; see dataset_loader.load_populations.
+
+    `vocabulary_df` is anything build_vocabulary can read the dropdown values from:
+    the full dataset, or just its distinct city/degree/profession rows.
+    """
+    student, student_columns = encode_population(populations['student'], one_hot_cols_students, numerical_cols_students, sparse)
+    professional, professional_columns = encode_population(populations['professional'], one_hot_cols_professionals, numerical_cols_professionals, sparse)
+    return {
+        'student': student,
+        'professional': professional,
+        'columns': {'student': student_columns, 'professional': professional_columns},
+        'vocabulary': build_vocabulary(vocabulary_df, student_columns, professional_columns, one_hot_cols_students, one_hot_cols_professionals),
+    }
+
+
+def dataset_hash(source, sparse=False):
+    """Hashes the dataset contents together with ENCODING_VERSION and the matrix format."""
+    layout = 'sparse' if sparse else 'dense'
+    return hashlib.sha256(f"encoding-v{ENCODING_VERSION}:{layout}:{source.fingerprint()}".encode()).hexdigest()[:16]
+
+
+def load_encoded_dataset(source, cache_dir=CACHE_DIR, use_cache=True, chunk_size=DEFAULT_CHUNK_SIZE, sparse=False):
+    """Returns encode_dataset's output, reusing the on-disk copy when the dataset is unchanged.
+
+    `source` is a dataset_loader source (CSV, Parquet or SQLite). It is read in one
+    streaming pass of chunk_size rows, so the raw survey is never held in memory
+    as a whole. With sparse=True the train/test matrices are CSR (see encode_population).
+    """
+    cache_path = os.path.join(cache_dir, f"encoded_{dataset_hash(source, sparse)}.joblib")
+    if use_cache and os.path.exists(cache_path):
+        print(f"Loading encoded train/test matrices from cache '{cache_path}'...")
+        return joblib.load(cache_path)
+
+    print("Loading and preprocessing data...")
+    populations, vocabulary_df = load_populations(source, chunk_size=chunk_size)
+    encoded = encode_populations(populations, vocabulary_df, sparse)
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        joblib.dump(encoded, cache_path)
+        print(f"Encoded train/test matrices cached to '{cache_path}'.")
+    return encoded
 
-professional_scaler = StandardScaler()
-X_train_pro[numerical_cols_professionals] = professional_scaler.fit_transform(X_train_pro[numerical_cols_professionals])
-X_test_pro[numerical_cols_professionals] = professional_scaler.transform(X_test_pro[numerical_cols_professionals])
 
 # --- Model Training and Evaluation ---
+def make_search(strategy, n_iter, n_jobs):
+    """Builds the hyperparameter search for one population ('grid', 'halving' or 'random')."""
+    rf = RandomForestClassifier(class_weight='balanced', random_state=42)
+    if strategy == 'grid':
+        return GridSearchCV(estimator=rf, param_grid=param_grid, cv=5, scoring='roc_auc', n_jobs=n_jobs, verbose=1)
+    if strategy == 'halving':
+        # Halve over the number of trees rather than samples: small subsamples of the
+        # dataset leave folds with only one class, where roc_auc is undefined
+        halving_grid = {k: v for k, v in param_grid.items() if k != 'n_estimators'}
+        return HalvingGridSearchCV(estimator=rf, param_grid=halving_grid, resource='n_estimators',
+                                   min_resources=min(param_grid['n_estimators']), max_resources=max(param_grid['n_estimators']),
+                                   factor=2, cv=5, scoring='roc_auc', n_jobs=n_jobs, random_state=42, verbose=1)
+    if strategy == 'random':
+        return RandomizedSearchCV(estimator=rf, param_distributions=param_distributions, n_iter=n_iter, cv=5, scoring='roc_auc', n_jobs=n_jobs, random_state=42, verbose=1)
+    raise ValueError(f"Unknown search strategy: {strategy}")
+
+
+def run_searches(encoded, strategy='grid', n_iter=10, n_jobs=-1):
+    """Fits the student and professional searches at the same time.
+
+    Both searches use joblib's loky backend, whose reusable executor is a process-wide
+    singleton, so their cross-validation fits are interleaved on one shared process
+    pool instead of the second search waiting for the first to finish.
+    """
+    searches = {population: make_search(strategy, n_iter, n_jobs) for population in ('student', 'professional')}
+    with ThreadPoolExecutor(max_workers=len(searches)) as executor:
+        futures = {
+            population: executor.submit(search.fit, encoded[population][0], encoded[population][2])
+            for population, search in searches.items()
+        }
+        for future in futures.values():
+            future.result()
+    return searches
+
+
+def plot_roc_curve(fpr, tpr, roc_auc, color, title, path):
+    plt.figure()
+    plt.plot(fpr, tpr, color=color, lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title(title)
+    plt.legend(loc="lower right")
+    plt.savefig(path)
+    plt.clf()
+
+
+def evaluate_student_model(search, X_test_stu, y_test_stu):
+    print("--- Student Model (Random Forest) ---")
+    best_model_students = search.best_estimator_
+    y_pred_stu = best_model_students.predict(X_test_stu)
+    y_pred_proba_stu = best_model_students.predict_proba(X_test_stu)[:, 1]
+
+    print("Best Student Model Parameters:")
+    print(search.best_params_)
+    print("Student Model Performance Metrics:")
+    print(f"Accuracy: {accuracy_score(y_test_stu, y_pred_stu):.4f}")
+    fpr_stu, tpr_stu, _ = roc_curve(y_test_stu, y_pred_proba_stu)
+    roc_auc_stu = auc(fpr_stu, tpr_stu)
+    print(f"AUC Score: {roc_auc_stu:.4f}")
+    print("Confusion Matrix:", confusion_matrix(y_test_stu, y_pred_stu))
+    print("Classification Report:", classification_report(y_test_stu, y_pred_stu))
+
+    # Plot and save ROC curve for Student Model
+    plot_roc_curve(fpr_stu, tpr_stu, roc_auc_stu, 'darkorange', 'ROC Curve - Student Model', 'student_model_roc_curve.png')
+    print("Student model ROC curve saved to student_model_roc_curve.png")
+    return best_model_students
+
+
+def evaluate_professional_model(search, X_test_pro, y_test_pro):
+    print("--- Professional Model (Random Forest) ---")
+    best_model_professionals = search.best_estimator_
+    y_pred_proba_pro = best_model_professionals.predict_proba(X_test_pro)[:, 1]
+
+    # Apply a threshold of 0.445 for professional model predictions
+    y_pred_pro = (y_pred_proba_pro >= PROFESSIONAL_DECISION_THRESHOLD).astype(int)
+
+    print("Best Professional Model Parameters:")
+    print(search.best_params_)
+    print("Professional Model Performance Metrics (Threshold = 0.445):")
+    print(f"Accuracy: {accuracy_score(y_test_pro, y_pred_pro):.4f}")
+    fpr_pro, tpr_pro, _ = roc_curve(y_test_pro, y_pred_proba_pro)
+    roc_auc_pro = auc(fpr_pro, tpr_pro)
+    print(f"AUC Score: {roc_auc_pro:.4f}")
+    print("Confusion Matrix:", confusion_matrix(y_test_pro, y_pred_pro))
+    print("Classification Report:", classification_report(y_test_pro, y_pred_pro))
+
+    # Plot and save ROC curve for Professional Model
+    plot_roc_curve(fpr_pro, tpr_pro, roc_auc_pro, 'darkgreen', 'ROC Curve - Professional Model', 'professional_model_roc_curve.png')
+    print("Professional model ROC curve saved to professional_model_roc_curve.png")
+    return best_model_professionals
+
+
+def compress_models(encoded, models, tolerance=DEFAULT_AUC_TOLERANCE, report_path=COMPRESSION_REPORT_PATH):
+    """Measures every compression candidate of each population's model and returns the ones to ship.
+
+    See forest_compression.compression_candidates. The report, with serving latency,
+    SHAP latency, bundle size and test AUC for every candidate, is written to
+    report_path as JSON.
+    """
+    report = {'auc_tolerance': tolerance, 'populations': {}}
+    chosen = {}
+    for population, model in models.items():
+        X_train, X_test, y_train, y_test, scaler = encoded[population]
+        columns = encoded['columns'][population]
+        if population == 'student':
+            numerical_cols, one_hot_cols = numerical_cols_students, one_hot_cols_students
+        else:
+            numerical_cols, one_hot_cols = numerical_cols_professionals, one_hot_cols_professionals
+
+        def write_candidate(path, candidate, scaler=scaler, columns=columns, numerical_cols=numerical_cols, one_hot_cols=one_hot_cols):
+            write_bundle(path, population, candidate, scaler, columns, numerical_cols, one_hot_cols, encoded['vocabulary'])
+
+        candidates = compression_candidates(model, X_train, y_train, X_test, y_test, write_candidate)
+        entries = [entry for entry, _ in candidates]
+        selected = select_candidate(entries, tolerance)
+        chosen[population] = candidates[selected][1]
+        report['populations'][population] = {
+            'original': {'n_trees': len(model.estimators_), 'n_nodes': int(sum(e.tree_.node_count for e in model.estimators_))},
+            'selected': selected,
+            'candidates': entries,
+        }
+
+        print(f"--- {population.capitalize()} model compression candidates ---")
+        print(f"{'':2}{'trees':>6}{'depth':>7}{'prune':>8}{'nodes':>8}{'bundle KB':>11}{'AUC':>9}{'predict ms':>12}{'SHAP ms':>9}")
+        for i, entry in enumerate(entries):
+            depth = '-' if entry['max_depth'] is None else entry['max_depth']
+            print(f"{'*' if i == selected else '':2}{entry['n_trees']:>6}{depth:>7}{entry['min_contribution']:>8g}{entry['n_nodes']:>8}"
+                  f"{entry['bundle_bytes'] / 1024:>11.1f}{entry['test_auc']:>9.4f}{entry['predict_ms']:>12.3f}{entry['shap_ms']:>9.2f}")
+
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Compression report saved to {report_path}")
+    return chosen
+
+
+def peer_distributions(encoded, models):
+    """Scores every surveyed row of each population as a new respondent would be scored.
+
+    A new respondent always gets an out-of-sample score, while a forest scores the
+    rows it was fitted on closer to their labels. So test rows get the model's score,
+    and training rows their out-of-bag score: the average over the trees whose
+    bootstrap sample left them out. Training rows every tree saw (rare with more than
+    a few trees, all of them without bootstrap) are left out. `models` maps each population to its
+    fitted model. Returns (scores, cohorts) as build_percentiles takes them; each
+    row's cohort values are read back from its one-hot columns.
+    """
+    scores, cohorts = {}, {}
+    for population, model in models.items():
+        X_train, X_test = encoded[population][:2]
+        oob_probabilities, oob = out_of_bag_probabilities(model, X_train)
+        sparse = sp.issparse(X_train)
+        X = sp.vstack([X_train[oob], X_test], format='csr') if sparse else pd.concat([X_train[oob], X_test])
+        scores[population] = np.concatenate([oob_probabilities, model.predict_proba(X_test)[:, 1]]) * 10
+        columns = encoded['columns'][population]
+        cohorts[population] = {}
+        for feature in COHORT_FEATURES[population]:
+            prefix = f"{feature}_"
+            positions = [i for i, col in enumerate(columns) if col.startswith(prefix)]
+            block = X[:, positions].toarray() if sparse else X.iloc[:, positions].to_numpy()
+            values = np.array([columns[i][len(prefix):] for i in positions], dtype=object)
+            cohorts[population][feature] = values[block.argmax(axis=1)]
+    return scores, cohorts
 
-# Define the parameter grid from application.py
-param_grid = {
-    'n_estimators': [10,20,30,40,50],  
-    'max_depth': [5,10],      
-    'min_samples_split': [2,3,4]
-}
-
-# --- Student Model ---
-print("--- Training and Evaluating Student Model (Random Forest with GridSearchCV) ---")
-rf_stu = RandomForestClassifier(class_weight='balanced', random_state=42)
-grid_search_stu = GridSearchCV(estimator=rf_stu, param_grid=param_grid, cv=5, scoring='roc_auc', n_jobs=-1, verbose=1)
-grid_search_stu.fit(X_train_stu, y_train_stu)
-best_model_students = grid_search_stu.best_estimator_
-y_pred_stu = best_model_students.predict(X_test_stu)
-y_pred_proba_stu = best_model_students.predict_proba(X_test_stu)[:, 1]
-
-print("Best Student Model Parameters:")
-print(grid_search_stu.best_params_)
-print("Student Model Performance Metrics:")
-print(f"Accuracy: {accuracy_score(y_test_stu, y_pred_stu):.4f}")
-fpr_stu, tpr_stu, _ = roc_curve(y_test_stu, y_pred_proba_stu)
-roc_auc_stu = auc(fpr_stu, tpr_stu)
-print(f"AUC Score: {roc_auc_stu:.4f}")
-print("Confusion Matrix:", confusion_matrix(y_test_stu, y_pred_stu))
-print("Classification Report:", classification_report(y_test_stu, y_pred_stu))
-
-# Plot and save ROC curve for Student Model
-plt.figure()
-plt.plot(fpr_stu, tpr_stu, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc_stu:.2f})')
-plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-plt.xlim([0.0, 1.0])
-plt.ylim([0.0, 1.05])
-plt.xlabel('False Positive Rate')
-plt.ylabel('True Positive Rate')
-plt.title('ROC Curve - Student Model')
-plt.legend(loc="lower right")
-plt.savefig('student_model_roc_curve.png')
-print("Student model ROC curve saved to student_model_roc_curve.png")
-plt.clf()
-
-# --- Professional Model ---
-print("--- Training and Evaluating Professional Model (Random Forest with GridSearchCV) ---")
-rf_pro = RandomForestClassifier(class_weight='balanced', random_state=42)
-grid_search_pro = GridSearchCV(estimator=rf_pro, param_grid=param_grid, cv=5, scoring='roc_auc', n_jobs=-1, verbose=1)
-grid_search_pro.fit(X_train_pro, y_train_pro)
-best_model_professionals = grid_search_pro.best_estimator_
-y_pred_proba_pro = best_model_professionals.predict_proba(X_test_pro)[:, 1]
-
-# Apply a threshold of 0.445 for professional model predictions
-y_pred_pro = (y_pred_proba_pro >= 0.445).astype(int)
-
-print("Best Professional Model Parameters:")
-print(grid_search_pro.best_params_)
-print("Professional Model Performance Metrics (Threshold = 0.445):")
-print(f"Accuracy: {accuracy_score(y_test_pro, y_pred_pro):.4f}")
-fpr_pro, tpr_pro, _ = roc_curve(y_test_pro, y_pred_proba_pro)
-roc_auc_pro = auc(fpr_pro, tpr_pro)
-print(f"AUC Score: {roc_auc_pro:.4f}")
-print("Confusion Matrix:", confusion_matrix(y_test_pro, y_pred_pro))
-print("Classification Report:", classification_report(y_test_pro, y_pred_pro))
-
-# Plot and save ROC curve for Professional Model
-plt.figure()
-plt.plot(fpr_pro, tpr_pro, color='darkgreen', lw=2, label=f'ROC curve (area = {roc_auc_pro:.2f})')
-plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-plt.xlim([0.0, 1.0])
-plt.ylim([0.0, 1.05])
-plt.xlabel('False Positive Rate')
-plt.ylabel('True Positive Rate')
-plt.title('ROC Curve - Professional Model')
-plt.legend(loc="lower right")
-plt.savefig('professional_model_roc_curve.png')
-print("Professional model ROC curve saved to professional_model_roc_curve.png")
-plt.clf()
 
 # --- Save Models, Columns, and Scalers ---
-models_dir = 'models'
-if not os.path.exists(models_dir):
-    os.makedirs(models_dir)
-
-joblib.dump(best_model_students, os.path.join(models_dir, 'best_model_students.pkl'))
-joblib.dump(best_model_professionals, os.path.join(models_dir, 'best_model_professionals.pkl'))
-joblib.dump(student_scaler, os.path.join(models_dir, 'student_scaler.pkl'))
-joblib.dump(professional_scaler, os.path.join(models_dir, 'professional_scaler.pkl'))
-print(f"Models and scalers saved successfully in '{models_dir}' directory.")
-
-# Save the column lists for student and professional models separately
-with open(os.path.join(models_dir, 'student_columns.json'), 'w') as f:
-    json.dump(X_train_stu.columns.tolist(), f)
-with open(os.path.join(models_dir, 'professional_columns.json'), 'w') as f:
-    json.dump(X_train_pro.columns.tolist(), f)
-print(f"Column lists saved successfully in '{models_dir}' directory.")
\ No newline at end of file
+def save_artifacts(encoded, best_model_students, best_model_professionals, models_dir=MODELS_DIR):
+    student_scaler = encoded['student'][4]
+    professional_scaler = encoded['professional'][4]
+    student_columns = encoded['columns']['student']
+    professional_columns = encoded['columns']['professional']
+    if not os.path.exists(models_dir):
+        os.makedirs(models_dir)
+
+    joblib.dump(best_model_students, os.path.join(models_dir, 'best_model_students.pkl'))
+    joblib.dump(best_model_professionals, os.path.join(models_dir, 'best_model_professionals.pkl'))
+    joblib.dump(student_scaler, os.path.join(models_dir, 'student_scaler.pkl'))
+    joblib.dump(professional_scaler, os.path.join(models_dir, 'professional_scaler.pkl'))
+    print(f"Models and scalers saved successfully in '{models_dir}' directory.")
+
+    # Save the column lists for student and professional models separately
+    with open(os.path.join(models_dir, 'student_columns.json'), 'w') as f:
+        json.dump(student_columns, f)
+    with open(os.path.join(models_dir, 'professional_columns.json'), 'w') as f:
+        json.dump(professional_columns, f)
+    print(f"Column lists saved successfully in '{models_dir}' directory.")
+
+    # Save the categorical vocabulary (dropdown values and one-hot index maps) so the web app
+    # does not need to ship or parse the dataset
+    save_vocabulary(encoded['vocabulary'], models_dir)
+    print(f"Categorical vocabulary saved successfully in '{models_dir}' directory.")
+
+    # Sorted risk scores of the surveyed peers, for "higher than X% of peers" (see percentiles.py)
+    scores, cohorts = peer_distributions(encoded, {'student': best_model_students, 'professional': best_model_professionals})
+    save_percentiles(build_percentiles(scores, cohorts), models_dir)
+    print(f"Risk score percentiles saved successfully in '{models_dir}' directory.")
+
+    # One memory-mappable bundle per population holding all of the above plus the
+    # decision thresholds; this is what the web app serves from (see model_bundle.py)
+    write_bundle(bundle_path(models_dir, 'student'), 'student', best_model_students, student_scaler,
+                 student_columns, numerical_cols_students, one_hot_cols_students, encoded['vocabulary'],
+                 decision_threshold=DEFAULT_DECISION_THRESHOLD)
+    write_bundle(bundle_path(models_dir, 'professional'), 'professional', best_model_professionals, professional_scaler,
+                 professional_columns, numerical_cols_professionals, one_hot_cols_professionals, encoded['vocabulary'],
+                 decision_threshold=PROFESSIONAL_DECISION_THRESHOLD)
+    print(f"Model bundles saved successfully in '{models_dir}' directory.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the student and professional depression risk models.")
+    parser.add_argument('--data', default=DATASET_PATH, help="Survey dataset: CSV, Parquet (.parquet) or SQLite (.db, with --table)")
+    parser.add_argument('--table', help="Table to read when --data is a SQLite database")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read at a time")
+    parser.add_argument('--sparse', action='store_true',
+                        help="Train on sparse (CSR) one-hot matrices, whose size grows with the number of answers rather than of distinct values")
+    parser.add_argument('--search', choices=['grid', 'halving', 'random'], default='grid',
+                        help="Hyperparameter search: exhaustive grid (default), successive halving, or randomized")
+    parser.add_argument('--n-iter', type=int, default=10, help="Candidates sampled per population with --search random")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Size of the shared process pool (-1 = all cores)")
+    parser.add_argument('--compress', action='store_true',
+                        help="Ship the smallest compressed forest (fewer trees, capped depth, pruned splits) within --auc-tolerance of the best test AUC")
+    parser.add_argument('--auc-tolerance', type=float, default=DEFAULT_AUC_TOLERANCE, help="Test AUC a compressed model may give up with --compress")
+    parser.add_argument('--compression-report', default=COMPRESSION_REPORT_PATH, help="Where --compress writes its candidate report")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Where encoded train/test matrices are cached")
+    parser.add_argument('--no-cache', action='store_true', help="Always re-encode the dataset")
+    args = parser.parse_args(argv)
+
+    source = open_dataset(args.data, table=args.table)
+    encoded = load_encoded_dataset(source, cache_dir=args.cache_dir, use_cache=not args.no_cache,
+                                   chunk_size=args.chunk_size, sparse=args.sparse)
+
+    print(f"--- Training Student and Professional Models (Random Forest, {args.search} search) ---")
+    searches = run_searches(encoded, strategy=args.search, n_iter=args.n_iter, n_jobs=args.n_jobs)
+
+    _, X_test_stu, _, y_test_stu, _ = encoded['student']
+    _, X_test_pro, _, y_test_pro, _ = encoded['professional']
+    best_model_students = evaluate_student_model(searches['student'], X_test_stu, y_test_stu)
+    best_model_professionals = evaluate_professional_model(searches['professional'], X_test_pro, y_test_pro)
+
+    if args.compress:
+        compressed = compress_models(encoded, {'student': best_model_students, 'professional': best_model_professionals},
+                                     tolerance=args.auc_tolerance, report_path=args.compression_report)
+        best_model_students, best_model_professionals = compressed['student'], compressed['professional']
+
+    save_artifacts(encoded, best_model_students, best_model_professionals)
+
+
+if __name__ == '__main__':
+    main()
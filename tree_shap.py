@@ -0,0 +1,227 @@
+import numpy as np
+from scipy import sparse
+
+# Upper bound on the number of (quadrature cell, row) values materialised at once;
+# batches are split into row chunks that stay under it.
+MAX_CHUNK_CELLS = 4_000_000
+
+# Below this many rows, slicing the sparse matrices down to the requested columns costs
+# more than evaluating every slot, so column-restricted calls evaluate them all.
+RESTRICT_MIN_ROWS = 8
+
+
+class ForestExplainer:
+    """Exact path-dependent TreeSHAP for the served RandomForestClassifiers.
+
+    At construction the forest is flattened into one root-to-leaf path per leaf. Each
+    path keeps, for every distinct feature it splits on, the interval (lo, hi] that
+    the leaf requires and the fraction of training cover that flows down those
+    edges. Repeated splits on a feature are merged, as in the TreeSHAP algorithm.
+    Everything is stored in contiguous (n_paths, max_depth) NumPy arrays.
+
+    For a path with leaf value v the SHAP value of feature i is
+
+        v * (o_i - z_i) * integral_0^1 prod_{j != i} (z_j + (o_j - z_j) t) dt
+
+    where o_j says whether x falls in the path's interval for feature j and z_j is
+    its cover fraction. The integrand is a polynomial of degree < max_depth, so
+    Gauss-Legendre quadrature evaluates it exactly. Products and integrals over all
+    paths reduce to a few sparse matrix products over the whole batch. The result
+    matches shap.TreeExplainer(model).shap_values(X)[1].
+    """
+
+    def __init__(self, model, positive_class=1):
+        self.n_features = model.n_features_in_
+        class_pos = list(model.classes_).index(positive_class)
+        n_trees = len(model.estimators_)
+
+        paths = []
+        expected_value = 0.0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            counts = tree.value[:, 0, :]
+            leaf_values = counts[:, class_pos] / counts.sum(axis=1) / n_trees
+            cover = tree.weighted_n_node_samples
+            expected_value += float(np.dot(cover[tree.children_left == -1], leaf_values[tree.children_left == -1]) / cover[0])
+            paths.extend(self._tree_paths(tree, leaf_values, cover))
+        self.expected_value = expected_value
+
+        max_len = max(1, max(len(conditions) for _, conditions in paths))
+        n_paths = len(paths)
+        self.path_value = np.empty(n_paths, dtype=np.float64)
+        self.path_feature = np.zeros((n_paths, max_len), dtype=np.intp)
+        self.path_lo = np.full((n_paths, max_len), -np.inf, dtype=np.float64)
+        self.path_hi = np.full((n_paths, max_len), np.inf, dtype=np.float64)
+        self.path_zero = np.ones((n_paths, max_len), dtype=np.float64)
+        self.path_mask = np.zeros((n_paths, max_len), dtype=bool)
+        for p, (value, conditions) in enumerate(paths):
+            self.path_value[p] = value
+            for d, (feature, (lo, hi, zero)) in enumerate(conditions.items()):
+                self.path_feature[p, d] = feature
+                self.path_lo[p, d] = lo
+                self.path_hi[p, d] = hi
+                self.path_zero[p, d] = zero
+                self.path_mask[p, d] = True
+        self._prepare()
+
+    def _prepare(self):
+        """Builds the quadrature and sparse matrices shap_values uses from the path arrays."""
+        n_paths, max_len = self.path_feature.shape
+
+        # The integrand has degree < max_len, which (max_len + 1) // 2 nodes integrate exactly
+        n_points = max(1, (max_len + 1) // 2)
+        nodes, weights = np.polynomial.legendre.leggauss(n_points)
+        t = (nodes + 1) / 2
+        w = weights / 2
+
+        # Each factor is z (1 - t) when x leaves the path's interval and z + (1 - z) t
+        # when it stays inside. Padding slots use 1 for both so they drop out.
+        zero = self.path_zero[..., None]
+        factor_out = np.where(self.path_mask[..., None], zero * (1 - t), 1.0)
+        factor_in = np.where(self.path_mask[..., None], zero + (1 - zero) * t, 1.0)
+        self.log_base = np.log(factor_out).sum(axis=1).ravel()
+        self.gap_out = (np.where(self.path_mask, -self.path_zero, 0.0) * self.path_value[:, None]).ravel()
+        self.gap_in = (np.where(self.path_mask, 1 - self.path_zero, 0.0) * self.path_value[:, None]).ravel()
+
+        # Slots are numbered path * max_len + depth and quadrature cells path * n_points + q.
+        # Every path only touches its own slots and cells, so the per-path products and
+        # integrals become block-diagonal sparse matrices applied to the whole forest.
+        path, depth, q = np.meshgrid(np.arange(n_paths), np.arange(max_len), np.arange(n_points), indexing='ij')
+        slot = (path * max_len + depth).ravel()
+        cell = (path * n_points + q).ravel()
+        n_slots, n_cells = n_paths * max_len, n_paths * n_points
+        # log product over a path's slots = log_base + log_gain @ inside
+        self.log_gain = sparse.csr_matrix(((np.log(factor_in) - np.log(factor_out)).ravel(), (cell, slot)), shape=(n_cells, n_slots))
+        # Quadrature weights with the slot's own factor divided back out give the
+        # leave-one-out integral for each slot, for both states the slot can be in
+        self.weight_in = sparse.csr_matrix(((w / factor_in).ravel(), (slot, cell)), shape=(n_slots, n_cells))
+        self.weight_out = sparse.csr_matrix(((w / factor_out).ravel(), (slot, cell)), shape=(n_slots, n_cells))
+        self.slot_feature = self.path_feature.ravel()
+
+    # The path arrays fully describe an explainer; everything else is derived from them
+    ARRAY_NAMES = ('path_value', 'path_feature', 'path_lo', 'path_hi', 'path_zero', 'path_mask')
+
+    def to_arrays(self):
+        """Returns the flattened path arrays and the scalars needed to rebuild the explainer."""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_NAMES}
+        return arrays, {'n_features': int(self.n_features), 'expected_value': float(self.expected_value)}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """Rebuilds an explainer from to_arrays output without walking the forest again."""
+        explainer = cls.__new__(cls)
+        explainer.n_features = meta['n_features']
+        explainer.expected_value = meta['expected_value']
+        for name in cls.ARRAY_NAMES:
+            setattr(explainer, name, arrays[name])
+        explainer._prepare()
+        return explainer
+
+    @staticmethod
+    def _tree_paths(tree, leaf_values, cover):
+        """Yields (leaf value, {feature: (lo, hi, zero fraction)}) for every leaf of a tree."""
+        left, right = tree.children_left, tree.children_right
+        stack = [(0, {})]
+        while stack:
+            node, conditions = stack.pop()
+            if left[node] == -1:
+                yield leaf_values[node], conditions
+                continue
+            feature, threshold = int(tree.feature[node]), float(tree.threshold[node])
+            lo, hi, zero = conditions.get(feature, (-np.inf, np.inf, 1.0))
+            for child, child_lo, child_hi in ((left[node], lo, min(hi, threshold)), (right[node], max(lo, threshold), hi)):
+                child_conditions = dict(conditions)
+                child_conditions[feature] = (child_lo, child_hi, zero * cover[child] / cover[node])
+                stack.append((child, child_conditions))
+
+    def shap_values(self, X, columns=None):
+        """Returns the class-1 SHAP values of X as an (n_rows, n_features) array.
+
+        If `columns` is given, only those column indices are computed and every other
+        entry is left at zero; for larger batches this skips the integrals for every
+        slot that splits on another feature.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = X.astype(np.float32).astype(np.float64)
+        n_rows = X.shape[0]
+        out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        if columns is not None and n_rows < RESTRICT_MIN_ROWS:
+            keep = np.zeros(self.n_features, dtype=bool)
+            keep[np.asarray(list(columns), dtype=np.intp)] = True
+            out = self.shap_values(X)
+            out[:, ~keep] = 0.0
+            return out
+
+        if columns is None:
+            # Padding slots have zero gap, so every slot can be evaluated as-is
+            slots = slice(None)
+            weight_in, weight_out = self.weight_in, self.weight_out
+        else:
+            wanted = np.zeros(self.n_features, dtype=bool)
+            wanted[np.asarray(list(columns), dtype=np.intp)] = True
+            slots = np.flatnonzero((self.path_mask & wanted[self.path_feature]).ravel())
+            if len(slots) == 0:
+                return out
+            weight_in, weight_out = self.weight_in[slots], self.weight_out[slots]
+        if n_rows == 0:
+            return out
+        gap_in, gap_out = self.gap_in[slots, None], self.gap_out[slots, None]
+        slot_feature = self.slot_feature[slots]
+
+        chunk = max(1, MAX_CHUNK_CELLS // self.log_gain.shape[0])
+        for start in range(0, n_rows, chunk):
+            stop = min(start + chunk, n_rows)
+            rows = stop - start
+            # (slot, row): whether each row stays inside each path's interval
+            values = X[start:stop][:, self.path_feature]
+            inside = ((values > self.path_lo) & (values <= self.path_hi)).reshape(rows, -1).T
+
+            full = np.exp(self.log_base[:, None] + self.log_gain @ inside.astype(np.float64))
+            slot_inside = inside[slots]
+            phi = np.where(slot_inside, (weight_in @ full) * gap_in, (weight_out @ full) * gap_out)
+
+            flat_index = (np.arange(rows) * self.n_features + slot_feature[:, None]).ravel()
+            out[start:stop] = np.bincount(flat_index, weights=phi.ravel(), minlength=rows * self.n_features).reshape(rows, self.n_features)
+        return out
+
+
+def verify_against_shap(model, n_rows=200, seed=0, atol=1e-9):
+    """Compares ForestExplainer with shap.TreeExplainer on rows sampled around the split thresholds.
+
+    Returns the largest absolute difference; raises AssertionError if it exceeds atol.
+    """
+    import shap
+
+    rng = np.random.default_rng(seed)
+    explainer = ForestExplainer(model)
+    thresholds = [[] for _ in range(explainer.n_features)]
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        for feature, threshold in zip(tree.feature, tree.threshold):
+            if feature >= 0:
+                thresholds[feature].append(threshold)
+
+    X = np.zeros((n_rows, explainer.n_features))
+    for feature, values in enumerate(thresholds):
+        if values:
+            picks = rng.choice(values, size=n_rows)
+            X[:, feature] = picks + rng.choice([-0.5, 0.0, 0.5], size=n_rows)
+    X = X.astype(np.float32).astype(np.float64)
+
+    reference = shap.TreeExplainer(model).shap_values(X)
+    reference = reference[1] if isinstance(reference, list) else reference
+    ours = explainer.shap_values(X)
+    max_diff = float(np.max(np.abs(ours - reference)))
+    assert max_diff <= atol, f"ForestExplainer differs from shap.TreeExplainer by {max_diff}"
+
+    proba = model.predict_proba(X)[:, 1]
+    additivity = float(np.max(np.abs(ours.sum(axis=1) + explainer.expected_value - proba)))
+    assert additivity <= atol, f"ForestExplainer is not additive to predict_proba (off by {additivity})"
+
+    columns = rng.choice(explainer.n_features, size=max(1, explainer.n_features // 10), replace=False)
+    partial = explainer.shap_values(X, columns=columns)
+    assert np.allclose(partial[:, columns], ours[:, columns], rtol=0, atol=atol), "Column-restricted SHAP values differ"
+    return max_diff
+
@@ -0,0 +1,77 @@
+import json
+import os
+
+VOCABULARY_FILENAME = 'vocabulary.json'
+VOCABULARY_FORMAT_VERSION = 1
+
+
+def one_hot_index(columns, one_hot_features):
+    """Maps each one-hot feature to {value: column index} using the "<feature>_<value>" column names."""
+    index = {feature: {} for feature in one_hot_features}
+    for i, column in enumerate(columns):
+        for feature in one_hot_features:
+            prefix = f"{feature}_"
+            if column.startswith(prefix):
+                index[feature][column[len(prefix):]] = i
+                break
+    return index
+
+
+def build_vocabulary(df, student_columns, professional_columns, one_hot_cols_students, one_hot_cols_professionals):
+    """Builds the dropdown values the web app needs plus the per-feature one-hot index maps.
+
+    `df` is the full survey dataset; the column lists are the ones saved next to the models.
+    """
+    students = df[df['Working Professional or Student'] == 'Student']
+    professionals = df[df['Working Professional or Student'] == 'Working Professional']
+    return {
+        'format_version': VOCABULARY_FORMAT_VERSION,
+        'unique_cities': sorted(df['City'].dropna().unique().tolist()),
+        'unique_student_degrees': sorted(students['Degree'].dropna().unique().tolist()),
+        'unique_professions': sorted(professionals['Profession'].dropna().unique().tolist()),
+        'all_unique_degrees': sorted(df['Degree'].dropna().unique().tolist()),
+        'one_hot_index': {
+            'student': one_hot_index(student_columns, one_hot_cols_students),
+            'professional': one_hot_index(professional_columns, one_hot_cols_professionals),
+        },
+    }
+
+
+def save_vocabulary(vocabulary, models_dir):
+    with open(os.path.join(models_dir, VOCABULARY_FILENAME), 'w') as f:
+        json.dump(vocabulary, f)
+
+
+def load_vocabulary(models_dir):
+    """Loads the vocabulary artifact; raises FileNotFoundError if train_models.py has not written one."""
+    with open(os.path.join(models_dir, VOCABULARY_FILENAME), 'r') as f:
+        vocabulary = json.load(f)
+    if vocabulary.get('format_version') != VOCABULARY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported vocabulary format version: {vocabulary.get('format_version')}")
+    return vocabulary
+
+
+def check_one_hot_index(index, columns):
+    """Raises ValueError if a one-hot index map does not match the model's column list."""
+    for feature, values in index.items():
+        for value, i in values.items():
+            if i >= len(columns) or columns[i] != f"{feature}_{value}":
+                raise ValueError(f"Vocabulary does not match the model columns at {feature}={value!r}; re-run train_models.py")
+
+
+if __name__ == '__main__':
+    # Rebuilds models/vocabulary.json from the dataset and the saved column lists,
+    # e.g. for models trained before train_models.py started writing it
+    import pandas as pd
+    import train_models
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    models_dir = os.path.join(base_dir, 'models')
+    df = pd.read_csv(os.path.join(base_dir, train_models.DATASET_PATH))
+    with open(os.path.join(models_dir, 'student_columns.json'), 'r') as f:
+        student_columns = json.load(f)
+    with open(os.path.join(models_dir, 'professional_columns.json'), 'r') as f:
+        professional_columns = json.load(f)
+    save_vocabulary(build_vocabulary(df, student_columns, professional_columns,
+                                     train_models.one_hot_cols_students, train_models.one_hot_cols_professionals), models_dir)
+    print(f"Vocabulary saved to '{os.path.join(models_dir, VOCABULARY_FILENAME)}'.")
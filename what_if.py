@@ -0,0 +1,70 @@
+import numpy as np
+
+# Values tried for the numerical answers a sweep varies, covering the survey's ranges
+NUMERIC_VALUES = {
+    'Work/Study Hours': [float(hours) for hours in range(0, 13)],
+    'CGPA': [5.0 + 0.5 * step for step in range(11)],
+}
+
+
+class WhatIfSweep:
+    """Builds the what-if grid for one model: a profile with one or two answers changed.
+
+    Built once per model from its FeatureEncoder and the features it may vary. Every
+    variant is derived from the profile's already-encoded row: a categorical answer
+    moves the row's 1 to another of the feature's one-hot columns, a numerical answer
+    overwrites its column with the value scaled as FeatureEncoder scales it. A variant
+    row is therefore the row encoding the changed profile would produce, and the whole
+    grid can be scored with one predict_proba call.
+    """
+
+    def __init__(self, encoder, features):
+        column_index = encoder.column_index
+        numerical = {int(col): k for k, col in enumerate(encoder.numerical_idx)}
+        # feature -> (values, column indices, encoded values with one row per value)
+        self.features = {}
+        for feature in features:
+            if feature in column_index and column_index[feature] in numerical:
+                k = numerical[column_index[feature]]
+                values = NUMERIC_VALUES.get(feature, [])
+                encoded = ((np.array(values, dtype=np.float64) - encoder.mean[k]) / encoder.scale[k])[:, None]
+                columns = [column_index[feature]]
+            elif feature in encoder.categorical_cols:
+                prefix = f"{feature}_"
+                values = [col[len(prefix):] for col in encoder.columns if col.startswith(prefix)]
+                columns = [column_index[prefix + value] for value in values]
+                encoded = np.eye(len(values))
+            else:
+                continue
+            if values:
+                self.features[feature] = (values, np.array(columns, dtype=np.intp), encoded)
+
+    def alternatives(self, row, feature):
+        """Positions of the feature's values that differ from what `row` encodes."""
+        _, columns, encoded = self.features[feature]
+        return [i for i in range(len(encoded)) if not np.array_equal(row[columns], encoded[i])]
+
+    def grid(self, row, pairs=()):
+        """Returns (matrix, changes) for an encoded row.
+
+        matrix[0] is `row` itself; each further matrix row is `row` with the answers
+        in the matching `changes` entry, a {feature: value} dict, swapped in. That is
+        every alternative value of each feature on its own, then for each (a, b) in
+        `pairs` every combination of an alternative for a with one for b.
+        """
+        alternatives = {feature: self.alternatives(row, feature) for feature in self.features}
+        changes = [((feature,), (i,)) for feature in self.features for i in alternatives[feature]]
+        for a, b in pairs:
+            changes += [((a, b), (i, j)) for i in alternatives[a] for j in alternatives[b]]
+
+        matrix = np.repeat(row[None, :], len(changes) + 1, axis=0)
+        for feature, (_, columns, encoded) in self.features.items():
+            positions, value_indices = [], []
+            for n, (features, indices) in enumerate(changes, start=1):
+                for changed, i in zip(features, indices):
+                    if changed == feature:
+                        positions.append(n)
+                        value_indices.append(i)
+            if positions:
+                matrix[np.ix_(positions, columns)] = encoded[value_indices]
+        return matrix, [{f: self.features[f][0][i] for f, i in zip(features, indices)} for features, indices in changes]